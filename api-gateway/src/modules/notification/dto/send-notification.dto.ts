@@ -7,6 +7,8 @@ import {
   IsOptional,
   IsNumber,
   IsUrl,
+  IsISO8601,
+  IsTimeZone,
   ValidateNested,
 } from 'class-validator';
 import { Type } from 'class-transformer';
@@ -123,4 +125,24 @@ export class SendNotificationDto {
   @IsObject()
   @IsOptional()
   metadata?: Record<string, any>;
+
+  @ApiProperty({
+    example: '2025-11-20T09:00',
+    description:
+      'Push only: ISO 8601 delivery time, local to timezone if it has no offset (optional)',
+    required: false,
+  })
+  @IsISO8601()
+  @IsOptional()
+  deliver_at?: string;
+
+  @ApiProperty({
+    example: 'Africa/Lagos',
+    description:
+      'Push only: IANA timezone of deliver_at, default UTC (optional)',
+    required: false,
+  })
+  @IsTimeZone()
+  @IsOptional()
+  timezone?: string;
 }
@@ -234,6 +234,8 @@ export class NotificationService implements OnModuleInit {
           link: dto.variables?.link || 'https://example.com',
           meta: {},
         },
+        ...(dto.deliver_at && { deliver_at: dto.deliver_at }),
+        ...(dto.timezone && { timezone: dto.timezone }),
       };
 
       this.rabbit.publish(routingKey, celeryMessage, {
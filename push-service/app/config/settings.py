@@ -0,0 +1,15 @@
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _load_env():
+    """Load .env once per process, on first access to a setting."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def get_setting(name: str, default=None):
+    _load_env()
+    return os.getenv(name, default)
@@ -1,7 +1,33 @@
-import os
-from dotenv import load_dotenv
+from app.config.settings import get_setting
 
-load_dotenv()
+RABBITMQ_URL = get_setting("RABBITMQ_URL")
 
-RABBITMQ_URL = os.getenv("RABBITMQ_URL")
+# Per-user coalescing of pushes into digests (disabled when the window is 0)
+COALESCE_WINDOW_SECONDS = float(get_setting("PUSH_COALESCE_WINDOW_SECONDS", "0"))
+COALESCE_MAX_KEYS = int(get_setting("PUSH_COALESCE_MAX_KEYS", "10000"))
+COALESCE_MAX_LINES = int(get_setting("PUSH_COALESCE_MAX_LINES", "3"))
+USER_MAX_PUSHES_PER_INTERVAL = int(get_setting("PUSH_USER_MAX_PER_INTERVAL", "0"))
+USER_PUSH_INTERVAL_SECONDS = float(get_setting("PUSH_USER_INTERVAL_SECONDS", "60"))
 
+# Scheduled delivery (messages carrying a future `deliver_at`)
+SCHEDULE_QUEUE_NAME = get_setting("PUSH_SCHEDULE_QUEUE", "push.scheduled")
+SCHEDULER_DB_PATH = get_setting("SCHEDULER_DB_PATH", "scheduler.db")
+SCHEDULER_TICK_SECONDS = float(get_setting("SCHEDULER_TICK_SECONDS", "1"))
+SCHEDULER_HORIZON_SECONDS = float(get_setting("SCHEDULER_HORIZON_SECONDS", "300"))
+SCHEDULER_MAX_LOADED = int(get_setting("SCHEDULER_MAX_LOADED", "100000"))
+SCHEDULER_BATCH_SIZE = int(get_setting("SCHEDULER_BATCH_SIZE", "500"))
+
+# Serializer used when this service publishes queue messages: "rawjson" or "pushpack"
+WIRE_FORMAT = get_setting("PUSH_WIRE_FORMAT", "rawjson")
+WIRE_COMPRESS_THRESHOLD = int(get_setting("PUSH_WIRE_COMPRESS_THRESHOLD", "1024"))
+WIRE_TEMPLATE_REFS = get_setting("PUSH_WIRE_TEMPLATE_REFS", "true").lower() in ("1", "true", "yes")
+
+# Consistent-hash sharded push queues (disabled when 0)
+SHARD_COUNT = int(get_setting("PUSH_SHARDS", "0"))
+SHARD_EXCHANGE_NAME = get_setting("PUSH_SHARD_EXCHANGE", "push.sharded")
+
+# Pruning of push tokens that FCM reports as unregistered or invalid
+TOKEN_PRUNING = get_setting("PUSH_TOKEN_PRUNING", "true").lower() in ("1", "true", "yes")
+TOKEN_PRUNE_BATCH_SIZE = int(get_setting("PUSH_TOKEN_PRUNE_BATCH_SIZE", "500"))
+TOKEN_PRUNE_INTERVAL_SECONDS = float(get_setting("PUSH_TOKEN_PRUNE_INTERVAL_SECONDS", "5"))
+DEAD_TOKEN_MAX_ENTRIES = int(get_setting("PUSH_DEAD_TOKEN_MAX_ENTRIES", "100000"))
@@ -2,8 +2,9 @@ from fastapi import APIRouter
 
 from app.services.notifier import send_notification
 from app.schemas.NotificationSchema import PushRequest
+from app.routers.profiler import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get("/health")
@@ -0,0 +1,133 @@
+"""
+Scheduler process: persists messages from the schedule queue and releases
+them to push.queue when they fall due. Run a single instance:
+
+    python -m app.scheduler.runner
+"""
+import logging
+import signal
+import sqlite3
+import threading
+import time
+
+from app.config.logging_config import setup_logging
+from app.config.worker_config import (
+    SCHEDULER_BATCH_SIZE,
+    SCHEDULER_DB_PATH,
+    SCHEDULER_HORIZON_SECONDS,
+    SCHEDULER_MAX_LOADED,
+    SCHEDULER_TICK_SECONDS,
+)
+from app.scheduler.scheduler import PushScheduler
+from app.scheduler.store import ScheduleStore
+from app.workers.worker import SCHEDULE_QUEUE, celery_app, publish_push
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def unwrap(payload):
+    """rawjson wraps plain messages in a task envelope; return the message itself."""
+    if isinstance(payload, dict) and "task" in payload:
+        return payload["args"][0]
+    return payload
+
+
+def decode(message):
+    payload = unwrap(message.decode())
+    if not isinstance(payload, dict):
+        raise TypeError(f"expected a JSON object, got {type(payload).__name__}")
+    return payload
+
+
+def reject(message, e):
+    """Drop a message that can never be scheduled, so it cannot block the queue."""
+    logger.error(f"Rejecting scheduled push message {message.body!r:.500}: {e}")
+    message.reject()
+
+
+def intake(scheduler, received):
+    """Schedule and ack a batch; returns how many were scheduled."""
+    decoded = []
+    for message in received:
+        try:
+            decoded.append((message, decode(message)))
+        except Exception as e:
+            reject(message, e)
+
+    try:
+        scheduler.schedule([payload for _, payload in decoded])
+        scheduled = decoded
+    except sqlite3.OperationalError:
+        # The store itself failed; leave the batch unacked for redelivery
+        raise
+    except Exception:
+        scheduled = []
+        for message, payload in decoded:
+            try:
+                scheduler.schedule([payload])
+            except sqlite3.OperationalError:
+                raise
+            except Exception as e:
+                reject(message, e)
+            else:
+                scheduled.append((message, payload))
+
+    for message, _ in scheduled:
+        message.ack()
+    return len(scheduled)
+
+
+def run(stopping: threading.Event):
+    store = ScheduleStore(SCHEDULER_DB_PATH)
+    scheduler = PushScheduler(
+        store,
+        publish=publish_push,
+        horizon=SCHEDULER_HORIZON_SECONDS,
+        max_loaded=SCHEDULER_MAX_LOADED,
+        batch_size=SCHEDULER_BATCH_SIZE,
+        tick=SCHEDULER_TICK_SECONDS,
+    )
+    logger.info(f"Scheduler started with {store.count()} scheduled pushes in {SCHEDULER_DB_PATH}")
+
+    with celery_app.connection_for_read() as conn:
+        intake = conn.SimpleQueue(SCHEDULE_QUEUE)
+        intake.consumer.qos(prefetch_count=SCHEDULER_BATCH_SIZE)
+        try:
+            while not stopping.is_set():
+                deadline = time.monotonic() + SCHEDULER_TICK_SECONDS
+                received = []
+                while len(received) < SCHEDULER_BATCH_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        received.append(intake.get(timeout=remaining))
+                    except intake.Empty:
+                        break
+
+                if received:
+                    scheduled = intake(scheduler, received)
+                    logger.info(f"Scheduled {scheduled} push messages")
+
+                try:
+                    released = scheduler.tick()
+                except Exception as e:
+                    logger.exception(f"Failed to release scheduled pushes: {e}")
+                    continue
+                if released:
+                    logger.info(f"Released {released} scheduled push messages")
+        finally:
+            intake.close()
+            store.close()
+
+
+def main():
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    signal.signal(signal.SIGINT, lambda *args: stopping.set())
+    run(stopping)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import logging
+import time
+import uuid
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.scheduler.timer_wheel import HierarchicalTimerWheel
+
+logger = logging.getLogger(__name__)
+
+# Raised by parse_deliver_at for a malformed deliver_at or timezone
+DELIVER_AT_ERRORS = (ValueError, TypeError, ZoneInfoNotFoundError)
+
+
+def parse_deliver_at(message: dict):
+    """
+    Epoch seconds of `message["deliver_at"]`, or None if it is not scheduled.
+
+    Accepts epoch seconds or ISO 8601. Naive times are local to
+    `message["timezone"]` (IANA name, default UTC), so "09:00 in the
+    user's timezone" is `{"deliver_at": "2025-11-20T09:00", "timezone": "Africa/Lagos"}`.
+    """
+    value = message.get("deliver_at")
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    deliver_at = datetime.fromisoformat(value)
+    if deliver_at.tzinfo is None:
+        deliver_at = deliver_at.replace(tzinfo=ZoneInfo(message.get("timezone") or "UTC"))
+    return deliver_at.timestamp()
+
+
+def schedule_id(message: dict) -> str:
+    return message.get("notification_id") or message.get("request_id") or str(uuid.uuid4())
+
+
+class PushScheduler:
+    """
+    Releases scheduled push messages when they fall due.
+
+    Every item is persisted in the store; only items due within `horizon`
+    seconds, and at most `max_loaded` of them, are held in the timer wheel.
+    The store is paged with a (due_at, id) cursor, so worker memory stays
+    constant however many items are scheduled. Due items are handed to
+    `publish(messages)` in batches of `batch_size` and deleted from the store
+    once published, giving at-least-once delivery across restarts.
+    """
+
+    def __init__(self, store, publish, horizon=300.0, max_loaded=100000, batch_size=500, tick=1.0, clock=time.time):
+        self.store = store
+        self.publish = publish
+        self.horizon = horizon
+        self.max_loaded = max_loaded
+        self.batch_size = batch_size
+        self.clock = clock
+        self.wheel = HierarchicalTimerWheel(tick=tick, start=clock())
+        self._loaded = {}
+        self._cursor = None
+
+    def schedule(self, messages):
+        """Persist messages; ones that sort at or before the load cursor go straight into the wheel."""
+        now = self.clock()
+        items = []
+        for message in messages:
+            try:
+                due_at = parse_deliver_at(message)
+            except DELIVER_AT_ERRORS as e:
+                logger.warning(f"Invalid deliver_at {message.get('deliver_at')!r}, releasing immediately: {e}")
+                due_at = None
+            items.append((schedule_id(message), now if due_at is None else due_at, message))
+        self.store.add_many(items)
+
+        for item_id, due_at, message in items:
+            if self._cursor is not None and (due_at, item_id) <= self._cursor:
+                self._load_item(item_id, due_at, message)
+            else:
+                # A reschedule past the cursor retires the timer already in the wheel.
+                self._loaded.pop(item_id, None)
+        return len(items)
+
+    def tick(self):
+        """Load the upcoming window, release everything due, and return how many were released."""
+        now = self.clock()
+        self._load_window(now)
+
+        due = []
+        for item_id, due_at in self.wheel.advance(now):
+            loaded = self._loaded.get(item_id)
+            # Skip timers left behind by a reschedule of the same id.
+            if loaded is not None and loaded[0] == due_at:
+                due.append((item_id, loaded[1]))
+                del self._loaded[item_id]
+
+        released = 0
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            try:
+                self.publish([self._release(message) for _, message in batch])
+            except Exception:
+                # Unpublished items are still in the store; rewind so they are loaded again.
+                for item_id, message in due[start:]:
+                    self._loaded.pop(item_id, None)
+                self._cursor = None
+                raise
+            self.store.delete_many([item_id for item_id, _ in batch])
+            released += len(batch)
+        return released
+
+    def loaded(self):
+        return len(self._loaded)
+
+    def _load_window(self, now):
+        capacity = self.max_loaded - len(self._loaded)
+        if capacity <= 0:
+            return
+        rows = self.store.load(self._cursor, now + self.horizon, capacity)
+        for item_id, due_at, message in rows:
+            self._load_item(item_id, due_at, message)
+        if rows:
+            self._cursor = (rows[-1][1], rows[-1][0])
+
+    def _load_item(self, item_id, due_at, message):
+        loaded = self._loaded.get(item_id)
+        if loaded is not None and loaded[0] == due_at:
+            return
+        self._loaded[item_id] = (due_at, message)
+        self.wheel.add(due_at, (item_id, due_at))
+
+    @staticmethod
+    def _release(message):
+        message = dict(message)
+        message.pop("deliver_at", None)
+        return message
@@ -0,0 +1,66 @@
+import json
+import sqlite3
+
+
+class ScheduleStore:
+    """
+    Durable store of scheduled push messages, backed by SQLite.
+
+    Rows are read in (due_at, id) order with keyset pagination, so the
+    scheduler can page through the near-future window without holding the
+    whole table in memory.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scheduled_pushes (
+                id TEXT PRIMARY KEY,
+                due_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_scheduled_pushes_due ON scheduled_pushes (due_at, id)")
+        self.conn.commit()
+
+    def add_many(self, items):
+        """Insert (id, due_at, message) tuples; an existing id is overwritten."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scheduled_pushes (id, due_at, payload) VALUES (?, ?, ?)",
+                ((item_id, due_at, json.dumps(message)) for item_id, due_at, message in items),
+            )
+
+    def load(self, after, until: float, limit: int):
+        """
+        Return up to `limit` (id, due_at, message) rows with due_at <= until,
+        ordered by (due_at, id) and strictly after the `after` cursor.
+        """
+        if after is None:
+            rows = self.conn.execute(
+                "SELECT id, due_at, payload FROM scheduled_pushes WHERE due_at <= ? ORDER BY due_at, id LIMIT ?",
+                (until, limit),
+            )
+        else:
+            after_due, after_id = after
+            rows = self.conn.execute(
+                "SELECT id, due_at, payload FROM scheduled_pushes "
+                "WHERE due_at <= ? AND (due_at > ? OR (due_at = ? AND id > ?)) "
+                "ORDER BY due_at, id LIMIT ?",
+                (until, after_due, after_due, after_id, limit),
+            )
+        return [(item_id, due_at, json.loads(payload)) for item_id, due_at, payload in rows]
+
+    def delete_many(self, ids):
+        with self.conn:
+            self.conn.executemany("DELETE FROM scheduled_pushes WHERE id = ?", ((item_id,) for item_id in ids))
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM scheduled_pushes").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
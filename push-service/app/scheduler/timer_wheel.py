@@ -0,0 +1,93 @@
+import heapq
+import itertools
+import math
+
+
+class HierarchicalTimerWheel:
+    """
+    Hierarchical hashed timing wheel.
+
+    Level 0 has `slots[0]` slots of one tick each; every higher level's slot
+    spans a full rotation of the level below. Timers are placed on the lowest
+    level whose current rotation contains their expiry tick, and cascade down
+    as the wheel turns, so add is O(1) and advancing one tick is O(expired +
+    cascaded). Timers beyond the top level's rotation wait in an overflow heap.
+    """
+
+    def __init__(self, tick: float = 1.0, slots=(60, 60, 24), start: float = 0.0):
+        self.tick = tick
+        self.slots = tuple(slots)
+        # spans[level] = ticks covered by one slot of that level
+        self.spans = [math.prod(self.slots[:level]) for level in range(len(self.slots) + 1)]
+        self.levels = [[[] for _ in range(n)] for n in self.slots]
+        self.current_tick = self._to_tick(start)
+        self._overflow = []
+        self._ready = []
+        self._counter = itertools.count()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, due_at: float, item):
+        self._size += 1
+        self._place(self._to_tick(due_at), item)
+
+    def advance(self, now: float):
+        """Turn the wheel to `now` and return the items that expired, oldest first."""
+        target = math.floor(now / self.tick)
+        expired, self._ready = self._ready, []
+
+        while self.current_tick < target and self._size > len(expired):
+            self.current_tick += 1
+            self._cascade()
+            slot = self.levels[0][self.current_tick % self.slots[0]]
+            if slot:
+                expired.extend(item for _, item in slot)
+                slot.clear()
+            if self._ready:
+                expired.extend(self._ready)
+                self._ready = []
+
+        # Every timer has expired: skip the empty ticks up to the target.
+        self.current_tick = max(self.current_tick, target)
+
+        self._size -= len(expired)
+        return expired
+
+    def _to_tick(self, timestamp: float) -> int:
+        return math.ceil(timestamp / self.tick)
+
+    def _place(self, expiry_tick: int, item):
+        if expiry_tick <= self.current_tick:
+            self._ready.append(item)
+            return
+
+        for level, span in enumerate(self.spans[:-1]):
+            rotation = self.spans[level + 1]
+            if expiry_tick // rotation == self.current_tick // rotation:
+                slot = (expiry_tick // span) % self.slots[level]
+                self.levels[level][slot].append((expiry_tick, item))
+                return
+
+        heapq.heappush(self._overflow, (expiry_tick, next(self._counter), item))
+
+    def _cascade(self):
+        """Redistribute higher-level slots whose span starts at the current tick."""
+        top = len(self.slots)
+        if self.current_tick % self.spans[top] == 0:
+            rotation = self.current_tick // self.spans[top]
+            while self._overflow and self._overflow[0][0] // self.spans[top] <= rotation:
+                expiry_tick, _, item = heapq.heappop(self._overflow)
+                self._place(expiry_tick, item)
+
+        for level in range(top - 1, 0, -1):
+            span = self.spans[level]
+            if self.current_tick % span:
+                continue
+            slot = self.levels[level][(self.current_tick // span) % self.slots[level]]
+            if slot:
+                entries = list(slot)
+                slot.clear()
+                for expiry_tick, item in entries:
+                    self._place(expiry_tick, item)
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.config.settings import get_setting
+from app.config.worker_config import SHARD_COUNT
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, name: str, max_entries: int, ttl: float, clock=time.monotonic):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Nothing tells the worker when a user changes templates or tokens, so the
+# caches are off unless sharding makes them pay for the staleness
+template_cache = TTLCache(
+    "templates",
+    int(get_setting("PUSH_TEMPLATE_CACHE_MAX_ENTRIES", "1000")),
+    float(get_setting("PUSH_TEMPLATE_CACHE_TTL_SECONDS", "60" if SHARD_COUNT else "0")),
+)
+token_cache = TTLCache(
+    "push_tokens",
+    int(get_setting("PUSH_TOKEN_CACHE_MAX_ENTRIES", "100000")),
+    float(get_setting("PUSH_TOKEN_CACHE_TTL_SECONDS", "30" if SHARD_COUNT else "0")),
+)
+
+
+def cache_stats():
+    return {cache.name: cache.stats() for cache in (template_cache, token_cache)}
@@ -0,0 +1,233 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+EVICTION_LOG_INTERVAL = 10.0
+# Neighbouring slots of UserCap searched for a user before one is recycled
+CAP_PROBES = 8
+
+
+class _Bucket:
+    __slots__ = ("user_id", "collapse_key", "deadline", "count", "titles", "bodies")
+
+    def __init__(self, user_id, collapse_key, deadline):
+        self.user_id = user_id
+        self.collapse_key = collapse_key
+        self.deadline = deadline
+        self.count = 0
+        self.titles = []
+        self.bodies = []
+
+
+def build_digest(titles, bodies, count):
+    """Merge buffered notifications into one (title, body) pair."""
+    if count == 1:
+        return titles[-1], bodies[-1]
+
+    title = titles[-1] if len(set(titles)) == 1 else f"{count} new notifications"
+    lines = list(bodies)
+    if count > len(lines):
+        lines.append(f"+{count - len(lines)} more")
+    return title, "\n".join(lines)
+
+
+def _fingerprint(user_id):
+    return int.from_bytes(hashlib.blake2b(str(user_id).encode(), digest_size=8).digest(), "little") or 1
+
+
+class UserCap:
+    """
+    Cap on digests per user per interval, kept in shared memory so every
+    pool process forked after it is created counts against the same totals.
+
+    Users are hashed into a table of `slots` entries. A user takes the first
+    free or expired slot among CAP_PROBES neighbours; when all of them are
+    held by other users, the one with the oldest interval is recycled, which
+    resets that user's count early.
+    """
+
+    def __init__(self, max_per_interval, interval, slots=65536):
+        self.max_per_interval = max_per_interval
+        self.interval = interval
+        self.slots = slots
+        self._keys = multiprocessing.RawArray("Q", slots)
+        self._starts = multiprocessing.RawArray("d", slots)
+        self._counts = multiprocessing.RawArray("q", slots)
+        self._lock = multiprocessing.Lock()
+
+    def reserve(self, user_id, now):
+        """Count a digest against the user's cap; return when to retry if capped."""
+        key = _fingerprint(user_id)
+        candidates = [(key + i) % self.slots for i in range(CAP_PROBES)]
+        with self._lock:
+            index = next((i for i in candidates if self._keys[i] == key), None)
+            if index is None:
+                index = min(candidates, key=lambda i: self._starts[i])
+                self._keys[index] = key
+                self._starts[index] = now
+                self._counts[index] = 0
+            elif now - self._starts[index] >= self.interval:
+                self._starts[index] = now
+                self._counts[index] = 0
+
+            if self._counts[index] >= self.max_per_interval:
+                return self._starts[index] + self.interval
+            self._counts[index] += 1
+            return None
+
+
+class PushCoalescer:
+    """
+    Buffers pushes per (user_id, collapse_key) for a short window and
+    delivers each buffer as a single digest push.
+
+    - window: seconds a buffer is held after its first message
+    - cap: optional UserCap; a capped buffer keeps collecting until the
+      user's interval resets
+    - max_keys: bound on open buffers; the one due soonest is flushed early when full
+    - max_lines: bodies kept per buffer, older ones are only counted
+
+    `deliver(user_id, collapse_key, title, body, count)` is called from the
+    flusher thread, or from the caller when a buffer is evicted early.
+    """
+
+    def __init__(self, deliver, window, cap=None, max_keys=10000, max_lines=3):
+        self.deliver = deliver
+        self.window = window
+        self.cap = cap
+        self.max_keys = max_keys
+        self.max_lines = max_lines
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._buckets = {}
+        # (deadline, seq, bucket) for every open bucket; entries whose bucket was
+        # delivered or rescheduled are skipped when they reach the top
+        self._deadlines = []
+        self._seq = itertools.count()
+        self._evictions = 0
+        self._eviction_logged_at = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="push-coalescer", daemon=True)
+        self._thread.start()
+
+    def add(self, user_id, collapse_key, title, body):
+        evicted = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("coalescer is closed")
+
+            key = (user_id, collapse_key)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    evicted = self._pop_next()
+                    self._evictions += 1
+                bucket = self._buckets[key] = _Bucket(user_id, collapse_key, time.monotonic() + self.window)
+                if self._push(bucket):
+                    self._wakeup.notify()
+
+            bucket.count += 1
+            bucket.titles.append(title)
+            bucket.bodies.append(body)
+            del bucket.titles[:-self.max_lines]
+            del bucket.bodies[:-self.max_lines]
+
+        if evicted is not None:
+            self._log_evictions()
+            self._deliver(evicted)
+
+    def close(self):
+        """Stop the flusher and deliver every buffered notification, ignoring the cap."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
+
+        with self._lock:
+            buckets = list(self._buckets.values())
+            self._buckets.clear()
+            self._deadlines.clear()
+        for bucket in buckets:
+            self._deliver(bucket)
+        if buckets:
+            logger.info(f"Flushed {len(buckets)} coalesced push buffers on shutdown")
+
+    def pending(self):
+        with self._lock:
+            return len(self._buckets)
+
+    def _push(self, bucket):
+        """Track a bucket's deadline; returns True if it is now the earliest one."""
+        heapq.heappush(self._deadlines, (bucket.deadline, next(self._seq), bucket))
+        return self._deadlines[0][2] is bucket
+
+    def _peek(self):
+        """Earliest live (deadline, bucket) entry, discarding stale ones."""
+        while self._deadlines:
+            deadline, _, bucket = self._deadlines[0]
+            if self._buckets.get((bucket.user_id, bucket.collapse_key)) is bucket and bucket.deadline == deadline:
+                return bucket
+            heapq.heappop(self._deadlines)
+        return None
+
+    def _pop_next(self):
+        bucket = self._peek()
+        heapq.heappop(self._deadlines)
+        del self._buckets[(bucket.user_id, bucket.collapse_key)]
+        return bucket
+
+    def _log_evictions(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._eviction_logged_at < EVICTION_LOG_INTERVAL:
+                return
+            evictions, self._evictions = self._evictions, 0
+            self._eviction_logged_at = now
+        logger.warning(f"Coalescing buffer full ({self.max_keys} keys), flushed {evictions} buffer(s) early")
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closed:
+                    now = time.monotonic()
+                    head = self._peek()
+                    if head is not None and head.deadline <= now:
+                        break
+                    self._wakeup.wait(None if head is None else head.deadline - now)
+                if self._closed:
+                    return
+
+                ready = []
+                while head is not None and head.deadline <= now:
+                    retry_at = self._reserve(head.user_id, now)
+                    if retry_at is None:
+                        ready.append(self._pop_next())
+                    else:
+                        heapq.heappop(self._deadlines)
+                        head.deadline = retry_at
+                        self._push(head)
+                    head = self._peek()
+
+            for bucket in ready:
+                self._deliver(bucket)
+
+    def _reserve(self, user_id, now):
+        if self.cap is None:
+            return None
+        return self.cap.reserve(user_id, now)
+
+    def _deliver(self, bucket):
+        title, body = build_digest(bucket.titles, bucket.bodies, bucket.count)
+        try:
+            self.deliver(bucket.user_id, bucket.collapse_key, title, body, bucket.count)
+        except Exception as e:
+            logger.exception(f"Failed to deliver coalesced push for user {bucket.user_id}: {e}")
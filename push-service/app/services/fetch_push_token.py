@@ -1,21 +1,24 @@
-import os
+import logging
 
-import requests
-from dotenv import load_dotenv
+from app.config.settings import get_setting
+from app.services.cache import token_cache
+from app.services.http_client import get_session
 
-from app.config.logging_config import setup_logging
+logger = logging.getLogger(__name__)
 
-logger = setup_logging()
-
-load_dotenv()
-USER_SERVICE_URL= os.getenv("USER_SERVICE_URL")
 
 def get_push_token(user_id: str):
-    url = f"{USER_SERVICE_URL}/api/v1/users/{user_id}/push-token"
+    cached = token_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    url = f"{get_setting('USER_SERVICE_URL')}/api/v1/users/{user_id}/push-token"
     try:
-        response =  requests.get(url)
+        response = get_session().get(url)
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        token_cache.set(user_id, data)
+        return data
 
     except Exception as e:
         logger.error(f"Failed to fetch token: {e}")
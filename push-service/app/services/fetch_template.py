@@ -1,21 +1,24 @@
-import os
+import logging
 
-import requests
-from dotenv import load_dotenv
+from app.config.settings import get_setting
+from app.services.cache import template_cache
+from app.services.http_client import get_session
 
-from app.config.logging_config import setup_logging
+logger = logging.getLogger(__name__)
 
-logger = setup_logging()
-
-load_dotenv()
-TEMPLATE_SERVICE_URL= os.getenv("TEMPLATE_SERVICE_URL")
 
 def get_template(code: str):
-    url = f"{TEMPLATE_SERVICE_URL}/api/v1/templates/{code}"
+    cached = template_cache.get(code)
+    if cached is not None:
+        return cached
+
+    url = f"{get_setting('TEMPLATE_SERVICE_URL')}/api/v1/templates/{code}"
     try:
-        response  = requests.get(url)
+        response = get_session().get(url)
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        template_cache.set(code, data)
+        return data
 
     except Exception as e:
         logger.error(f"Failed to fetch template: {e}")
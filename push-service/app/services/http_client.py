@@ -0,0 +1,37 @@
+import os
+import threading
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+
+
+def get_session():
+    """
+    Return a process-wide requests.Session.
+
+    The session is created on first use and re-created in a forked child,
+    so pooled connections are never shared between Celery prefork processes.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _lock:
+        if _session is None or _session_pid != pid:
+            import requests
+
+            _session = requests.Session()
+            _session_pid = pid
+    return _session
+
+
+def _reset_after_fork():
+    global _lock, _session, _session_pid
+    _lock = threading.Lock()
+    _session = None
+    _session_pid = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,33 +1,110 @@
-import firebase_admin
-from dotenv import load_dotenv
-from firebase_admin import credentials, messaging
+from __future__ import annotations
 
-from app.schemas.NotificationSchema import PushRequest
-import dotenv, os
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING
 
-load_dotenv()
+from app.config.settings import get_setting
+
+if TYPE_CHECKING:
+    from app.schemas.NotificationSchema import PushRequest
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-cred_path = os.path.join(BASE_DIR, "firebase_key.json")
+DEFAULT_CRED_PATH = os.path.join(BASE_DIR, "firebase_key.json")
+
+_lock = threading.Lock()
+_app = None
+_app_pid = None
+
+
+def get_firebase_app():
+    """
+    Initialize the Firebase app on first use in the current process.
+
+    Each forked worker process gets its own named app, so HTTP clients created
+    by firebase_admin are never inherited from the Celery parent.
+    """
+    global _app, _app_pid
+    pid = os.getpid()
+    if _app is not None and _app_pid == pid:
+        return _app
+
+    with _lock:
+        if _app is None or _app_pid != pid:
+            import firebase_admin
+            from firebase_admin import credentials
+
+            cred_path = get_setting("FIREBASE_CREDENTIALS_PATH", DEFAULT_CRED_PATH)
+            cred = credentials.Certificate(cred_path)
+            _app = firebase_admin.initialize_app(cred, name=f"push-service-{pid}")
+            _app_pid = pid
+    return _app
+
+
+def _reset_after_fork():
+    global _lock, _app, _app_pid
+    _lock = threading.Lock()
+    _app = None
+    _app_pid = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def classify_error(e: Exception):
+    """
+    Return (error_code, token_invalid) for an exception raised by messaging.send.
+
+    token_invalid is only set for errors after which FCM will never accept the
+    registration token again, so retrying or keeping it is pointless.
+    SENDER_ID_MISMATCH is not one of them: it usually means our own Firebase
+    credentials or project are wrong, and would otherwise prune every token.
+    """
+    from firebase_admin import exceptions, messaging
+
+    if isinstance(e, messaging.UnregisteredError):
+        return "UNREGISTERED", True
+    if isinstance(e, messaging.SenderIdMismatchError):
+        logger.error(f"FCM sender ID mismatch, check FIREBASE_CREDENTIALS_PATH and the Firebase project: {e}")
+        return "SENDER_ID_MISMATCH", False
+    if isinstance(e, exceptions.InvalidArgumentError) and "registration token" in str(e).lower():
+        return "INVALID_REGISTRATION_TOKEN", True
+    return getattr(e, "code", None) or type(e).__name__, False
 
-cred = credentials.Certificate(cred_path)
-firebase_admin.initialize_app(cred)
 
-FCM_TOKEN = os.getenv("FCM_TOKEN")
+def send_notification(data: PushRequest, token, collapse_key=None):
+    from firebase_admin import messaging
 
+    android = apns = None
+    if collapse_key:
+        # Devices keep only the latest undelivered message per collapse key.
+        android = messaging.AndroidConfig(collapse_key=collapse_key)
+        apns = messaging.APNSConfig(headers={"apns-collapse-id": collapse_key[:64]})
 
-def send_notification(data: PushRequest, token):
+    # FCM_TOKEN overrides the recipient for testing; only the user's own token is ever pruned
+    target = get_setting("FCM_TOKEN") or token
 
     message = messaging.Message(
         notification=messaging.Notification(
             title=data.title,
             body=data.body,
         ),
-        token=FCM_TOKEN,
+        android=android,
+        apns=apns,
+        token=target,
     )
 
     try:
-        response = messaging.send(message)
+        response = messaging.send(message, app=get_firebase_app())
         return {"success": True, "response": response}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        error_code, token_invalid = classify_error(e)
+        return {
+            "success": False,
+            "error": str(e),
+            "error_code": error_code,
+            "token_invalid": token_invalid and target == token,
+        }
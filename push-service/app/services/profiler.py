@@ -0,0 +1,339 @@
+"""
+Runtime-toggleable sampling profiler.
+
+While enabled, a background thread samples the stacks of threads that are
+inside a profiled unit of work (a Celery task or an HTTP request):
+
+- a `sample_rate` share of units are sampled every `interval` seconds, and the
+  stacks are aggregated into flamegraph-compatible folded lines
+  ("root;caller;callee count", as read by flamegraph.pl, speedscope, inferno)
+- units slower than `slow_threshold` are kept, with their stage timings and
+  stacks, in a bounded list; an unsampled unit still gets one stack snapshot
+  once it crosses the threshold
+
+When disabled, `begin`, `end` and `stage` reduce to a single check and no
+thread is running.
+
+The on/off switch lives in shared memory created before the Celery worker
+forks, so a broadcast handled by the parent reaches every pool process. Each
+process writes its samples to `<output_dir>/<name>-<pid>.folded` and
+`.slow.json` every `flush_interval` seconds and when profiling stops, and
+`collect` merges them.
+"""
+import contextlib
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from app.config.settings import get_setting
+
+logger = logging.getLogger(__name__)
+
+# Slots of the shared control array
+_ENABLED, _SAMPLE_RATE, _SLOW_THRESHOLD, _GENERATION = range(4)
+MAX_DEPTH = 128
+
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ("record", "name", "started")
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record.stages.append((self.name, time.perf_counter() - self.started))
+        return False
+
+
+class _Record:
+    __slots__ = ("name", "key", "started", "sampled", "stages", "stacks")
+
+    def __init__(self, name, key, sampled):
+        self.name = name
+        self.key = key
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.stages = []
+        self.stacks = Counter()
+
+    def as_dict(self, duration, in_flight=False):
+        return {
+            "name": self.name,
+            "key": self.key,
+            "duration_ms": round(duration * 1000, 3),
+            "in_flight": in_flight,
+            "stages": [{"stage": name, "ms": round(elapsed * 1000, 3)} for name, elapsed in self.stages],
+            "stacks": [f"{stack} {count}" for stack, count in self.stacks.most_common()],
+        }
+
+
+def fold_stack(frame):
+    """Collapse a frame chain into 'root;outer;...;inner' using module:qualname frames."""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """
+    - name: prefix of the files written to output_dir
+    - interval: seconds between samples
+    - sample_rate / slow_threshold: defaults for `enable`
+    - max_slow: slow units kept per process (newest win)
+    - flush_interval: seconds between writes of this process's samples
+    """
+
+    def __init__(self, name, output_dir, interval=0.01, sample_rate=0.1, slow_threshold=1.0,
+                 max_slow=100, flush_interval=10.0):
+        self.name = name
+        self.output_dir = output_dir
+        self.interval = interval
+        self.default_sample_rate = sample_rate
+        self.default_slow_threshold = slow_threshold
+        self.max_slow = max_slow
+        self.flush_interval = flush_interval
+
+        self._control = multiprocessing.RawArray("d", 4)
+        self._control[_SAMPLE_RATE] = sample_rate
+        self._control[_SLOW_THRESHOLD] = slow_threshold
+        self._reset_process_state()
+        os.register_at_fork(after_in_child=self._reset_process_state)
+
+    def _reset_process_state(self):
+        self._lock = threading.Lock()
+        self._active = {}
+        self._stacks = Counter()
+        self._slow = deque(maxlen=self.max_slow)
+        self._generation = self._control[_GENERATION]
+        self._sampler = None
+        self._dirty = False
+
+    # -- control ---------------------------------------------------------
+
+    @property
+    def enabled(self):
+        return bool(self._control[_ENABLED])
+
+    def enable(self, sample_rate=None, slow_threshold=None, reset=True):
+        """Start profiling in this process and, through shared memory, in its forked children."""
+        self._control[_SAMPLE_RATE] = self.default_sample_rate if sample_rate is None else sample_rate
+        self._control[_SLOW_THRESHOLD] = self.default_slow_threshold if slow_threshold is None else slow_threshold
+        if reset:
+            self.reset()
+        self._control[_ENABLED] = 1
+        logger.info(f"Profiler enabled: {self.status()}")
+        return self.status()
+
+    def disable(self):
+        """Stop profiling; samplers flush their data and exit on their next tick."""
+        self._control[_ENABLED] = 0
+        self._stop_sampler()
+        logger.info("Profiler disabled")
+        return self.status()
+
+    def reset(self):
+        """Discard collected samples in every process and remove written files."""
+        self._control[_GENERATION] += 1
+        self._check_generation()
+        for path in self._files("*"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self._control[_SAMPLE_RATE],
+            "slow_threshold_ms": self._control[_SLOW_THRESHOLD] * 1000,
+            "interval_ms": self.interval * 1000,
+            "output_dir": self.output_dir,
+        }
+
+    # -- instrumentation -------------------------------------------------
+
+    def begin(self, name, key=None):
+        """Mark the start of a unit of work on the current thread."""
+        if not self._control[_ENABLED]:
+            return
+        self._ensure_sampler()
+        sampled = random.random() < self._control[_SAMPLE_RATE]
+        self._active[threading.get_ident()] = _Record(name, key, sampled)
+
+    def end(self):
+        """Mark the end of the current thread's unit of work."""
+        if not self._active:
+            return
+        record = self._active.pop(threading.get_ident(), None)
+        if record is None:
+            return
+        duration = time.perf_counter() - record.started
+        if duration >= self._control[_SLOW_THRESHOLD]:
+            with self._lock:
+                self._slow.append(record.as_dict(duration))
+                self._dirty = True
+
+    def stage(self, name):
+        """Context manager timing one stage of the current unit of work."""
+        if not self._active:
+            return _NULL_STAGE
+        record = self._active.get(threading.get_ident())
+        if record is None:
+            return _NULL_STAGE
+        return _Stage(record, name)
+
+    # -- sampling --------------------------------------------------------
+
+    def _ensure_sampler(self):
+        sampler = self._sampler
+        if sampler is not None and sampler.is_alive():
+            return
+        with self._lock:
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._run, name=f"{self.name}-profiler", daemon=True)
+                self._sampler.start()
+
+    def _stop_sampler(self):
+        sampler = self._sampler
+        if sampler is not None and sampler is not threading.current_thread():
+            sampler.join(timeout=self.interval * 10 + 1)
+
+    def _run(self):
+        own = threading.get_ident()
+        next_flush = time.monotonic() + self.flush_interval
+        while self._control[_ENABLED]:
+            time.sleep(self.interval)
+            self._check_generation()
+            self._sample(own)
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_interval
+        self.flush()
+
+    def _check_generation(self):
+        if self._generation != self._control[_GENERATION]:
+            with self._lock:
+                self._generation = self._control[_GENERATION]
+                self._stacks.clear()
+                self._slow.clear()
+                self._dirty = False
+
+    def _sample(self, own):
+        if not self._active:
+            return
+        frames = sys._current_frames()
+        threshold = self._control[_SLOW_THRESHOLD]
+        now = time.perf_counter()
+        with self._lock:
+            for ident, record in list(self._active.items()):
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                if record.sampled:
+                    stack = fold_stack(frame)
+                    record.stacks[stack] += 1
+                    self._stacks[f"{record.name};{stack}"] += 1
+                    self._dirty = True
+                elif not record.stacks and now - record.started >= threshold:
+                    record.stacks[fold_stack(frame)] += 1
+        del frames
+
+    # -- output ----------------------------------------------------------
+
+    def _files(self, suffix):
+        return glob.glob(os.path.join(self.output_dir, f"{self.name}-{suffix}"))
+
+    def flush(self):
+        """Write this process's folded stacks and slow units (including running ones) to output_dir."""
+        now = time.perf_counter()
+        threshold = self._control[_SLOW_THRESHOLD]
+        with self._lock:
+            in_flight = [
+                record.as_dict(now - record.started, in_flight=True)
+                for record in list(self._active.values())
+                if now - record.started >= threshold
+            ]
+            if not self._dirty and not in_flight:
+                return
+            folded = [f"{stack} {count}" for stack, count in self._stacks.items()]
+            slow = list(self._slow) + in_flight
+            self._dirty = False
+
+        pid = os.getpid()
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(os.path.join(self.output_dir, f"{self.name}-{pid}.folded"), "w") as f:
+                f.write("\n".join(folded) + "\n" if folded else "")
+            with open(os.path.join(self.output_dir, f"{self.name}-{pid}.slow.json"), "w") as f:
+                json.dump(slow, f)
+        except OSError as e:
+            logger.error(f"Failed to write profile to {self.output_dir}: {e}")
+
+    def collect(self, limit=20):
+        """Merge every process's files; returns (folded lines, slowest units)."""
+        self.flush()
+        stacks = Counter()
+        for path in self._files("[0-9]*.folded"):
+            with open(path) as f:
+                for line in f:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack:
+                        stacks[stack] += int(count)
+
+        slow = []
+        for path in self._files("[0-9]*.slow.json"):
+            try:
+                with open(path) as f:
+                    slow.extend(json.load(f))
+            except (OSError, ValueError):
+                continue
+        slow.sort(key=lambda unit: unit["duration_ms"], reverse=True)
+
+        folded = [f"{stack} {count}" for stack, count in stacks.most_common()]
+        return folded, slow[:limit]
+
+    def dump(self, limit=20):
+        """Merge every process's samples into <output_dir>/<name>-merged.folded."""
+        folded, slow = self.collect(limit)
+        path = os.path.join(self.output_dir, f"{self.name}-merged.folded")
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(path, "w") as f:
+            f.write("\n".join(folded) + "\n" if folded else "")
+        return {
+            "path": path,
+            "stacks": len(folded),
+            "samples": sum(int(line.rpartition(" ")[2]) for line in folded),
+            "slow": slow,
+        }
+
+
+profiler = Profiler(
+    "push",
+    output_dir=get_setting("PROFILER_OUTPUT_DIR", "profiles"),
+    interval=float(get_setting("PROFILER_INTERVAL_MS", "10")) / 1000,
+    sample_rate=float(get_setting("PROFILER_SAMPLE_RATE", "0.1")),
+    slow_threshold=float(get_setting("PROFILER_SLOW_MS", "1000")) / 1000,
+    max_slow=int(get_setting("PROFILER_MAX_SLOW", "100")),
+    flush_interval=float(get_setting("PROFILER_FLUSH_SECONDS", "10")),
+)
+
+if get_setting("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes"):
+    profiler.enable()
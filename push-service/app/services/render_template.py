@@ -1,7 +1,5 @@
-from jinja2 import Template
-
-
 def render_template(template_str: str, context: dict) -> str:
+    from jinja2 import Template
 
     template = Template(template_str)
 
@@ -11,4 +9,4 @@ def render_template(template_str: str, context: dict) -> str:
 # context = {"name": "Uju", "order_id": 12345}
 #
 # rendered = render_template(template_str, context)
-# print(rendered)
\ No newline at end of file
+# print(rendered)
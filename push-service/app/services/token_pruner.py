@@ -0,0 +1,187 @@
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+
+from app.config.settings import get_setting
+from app.services.cache import token_cache
+from app.services.http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+# Largest batch user-service accepts (schemas.PushTokenPrune)
+MAX_PRUNE_BATCH = 1000
+
+
+def post_prune_batch(tokens):
+    """Ask user-service to delete a batch of dead push tokens; returns how many it removed."""
+    url = f"{get_setting('USER_SERVICE_URL')}/api/v1/users/push-tokens/prune"
+    response = get_session().post(url, json={"tokens": tokens})
+    response.raise_for_status()
+    return response.json().get("data", {}).get("pruned", 0)
+
+
+def is_rejected(error):
+    """True if user-service refused the request with a 4xx."""
+    from requests import HTTPError
+
+    return isinstance(error, HTTPError) and error.response is not None and 400 <= error.response.status_code < 500
+
+
+class SharedCounters:
+    """
+    Named integer counters in shared memory. Allocated before the worker
+    forks, so the pool children add to the totals the parent reports.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self._values = multiprocessing.Array("q", len(self.names))
+
+    def incr(self, name, amount=1):
+        index = self.names.index(name)
+        with self._values.get_lock():
+            self._values[index] += amount
+
+    def snapshot(self):
+        with self._values.get_lock():
+            return dict(zip(self.names, self._values[:]))
+
+
+prune_counters = SharedCounters((
+    "sends_attempted",
+    "sends_skipped",
+    "tokens_invalidated",
+    "tokens_pruned",
+    "prune_batches",
+    "prune_failures",
+    "prune_rejected",
+))
+
+
+def prune_stats(counters=prune_counters):
+    stats = counters.snapshot()
+    total = stats["sends_attempted"] + stats["sends_skipped"]
+    stats["avoided_ratio"] = round(stats["sends_skipped"] / total, 4) if total else 0.0
+    return stats
+
+
+class TokenPruner:
+    """
+    Remembers push tokens that FCM rejected for good and streams them to
+    user-service in batches.
+
+    - is_dead(token) lets the worker skip a send immediately, before the
+      token has been deleted upstream or has expired from the token cache
+    - batches of up to batch_size tokens (at most MAX_PRUNE_BATCH) are flushed
+      every interval seconds from a background thread; a batch that failed is
+      retried on the next flush, unless user-service rejected it with a 4xx
+    - max_entries bounds the dead-token set (oldest forgotten first)
+    - counters: SharedCounters, by default the process-wide prune_counters
+
+    `flush(tokens)` is called with a list of token strings.
+    """
+
+    def __init__(self, flush=post_prune_batch, batch_size=500, interval=5.0, max_entries=100000,
+                 counters=prune_counters):
+        self.flush = flush
+        self.batch_size = min(batch_size, MAX_PRUNE_BATCH)
+        self.interval = interval
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._dead = OrderedDict()
+        self._pending = []
+        self._closed = False
+        self.counters = counters
+        self._thread = threading.Thread(target=self._run, name="push-token-pruner", daemon=True)
+        self._thread.start()
+
+    def is_dead(self, token):
+        with self._lock:
+            return token in self._dead
+
+    def record_send(self, skipped=False):
+        self.counters.incr("sends_skipped" if skipped else "sends_attempted")
+
+    def mark_dead(self, user_id, token, error_code):
+        with self._lock:
+            if token in self._dead:
+                return
+            self._dead[token] = error_code
+            while len(self._dead) > self.max_entries:
+                self._dead.popitem(last=False)
+            self._pending.append(token)
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.notify()
+
+        self.counters.incr("tokens_invalidated")
+        token_cache.invalidate(user_id)
+        logger.info(f"Push token for user {user_id} rejected by FCM ({error_code}), queued for pruning")
+
+    def stats(self):
+        stats = prune_stats(self.counters)
+        with self._lock:
+            stats["dead_tokens"] = len(self._dead)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def close(self):
+        """Stop the flusher and push out whatever is still pending."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
+        while self._flush_batch():
+            pass
+
+    def _run(self):
+        while True:
+            with self._lock:
+                deadline = time.monotonic() + self.interval
+                while not self._closed and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                if self._closed:
+                    return
+
+            while self._flush_batch() and not self._closed:
+                pass
+
+    def _flush_batch(self):
+        """Send one batch; returns True if a full batch went out and more may be waiting."""
+        with self._lock:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+        if not batch:
+            return False
+
+        try:
+            pruned = self.flush(batch)
+        except Exception as e:
+            if not is_rejected(e):
+                return self._retry_later(batch, e)
+            # Retrying a request user-service refuses would stall pruning for good
+            logger.error(f"user-service rejected {len(batch)} push tokens for pruning, dropping them: {e}")
+            self.counters.incr("prune_rejected")
+            return False
+
+        self.counters.incr("tokens_pruned", pruned)
+        self.counters.incr("prune_batches")
+        logger.info(f"Pruned {pruned}/{len(batch)} dead push tokens")
+        return len(batch) == self.batch_size
+
+    def _retry_later(self, batch, e):
+        """Put a failed batch back at the head of the queue for the next flush."""
+        logger.error(f"Failed to prune {len(batch)} push tokens: {e}")
+        with self._lock:
+            self._pending[:0] = batch
+            del self._pending[self.max_entries:]
+        self.counters.incr("prune_failures")
+        return False
@@ -0,0 +1,124 @@
+"""
+Optional sharded push topology.
+
+Messages are published to a RabbitMQ consistent-hash exchange (requires the
+rabbitmq_consistent_hash_exchange plugin) with the user_id as routing key,
+which spreads users over `push.shard.<n>` queues. Each shard queue is
+single-active-consumer, so one worker node at a time receives a given user's
+messages and serves them from its warm caches. Within the node they are
+spread over the pool like any other task, so they are not strictly ordered.
+
+Workers claim shards by rendezvous hashing over the live worker set that
+Celery's gossip reports. A join or leave moves only the shards whose owner
+changed, and a shard's new owner becomes active once the old owner cancels.
+"""
+import hashlib
+import logging
+
+from celery import bootsteps
+from kombu import Exchange, Queue
+
+logger = logging.getLogger(__name__)
+
+
+def shard_exchange(name: str) -> Exchange:
+    return Exchange(name, type="x-consistent-hash", durable=True)
+
+
+def shard_queues(exchange: Exchange, count: int):
+    return [
+        Queue(
+            f"push.shard.{index}",
+            exchange,
+            routing_key="1",  # binding weight for the consistent-hash exchange
+            queue_arguments={"x-single-active-consumer": True},
+        )
+        for index in range(count)
+    ]
+
+
+def _score(node: str, shard: str) -> int:
+    digest = hashlib.blake2b(f"{node}|{shard}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def shard_owner(shard: str, nodes) -> str:
+    """Rendezvous (highest random weight) owner of a shard among nodes."""
+    return max(nodes, key=lambda node: _score(node, shard))
+
+
+def assign_shards(shards, nodes):
+    """Map every node to the list of shard names it owns."""
+    assignment = {node: [] for node in nodes}
+    for shard in shards:
+        assignment[shard_owner(shard, nodes)].append(shard)
+    return assignment
+
+
+def node_group(hostname: str) -> str:
+    """Worker group, i.e. the node name before '@' (push@host1 -> push)."""
+    return hostname.split("@", 1)[0]
+
+
+class ShardClaimer(bootsteps.StartStopStep):
+    """Consumer step that consumes the shard queues this worker owns."""
+
+    requires = (
+        "celery.worker.consumer.tasks:Tasks",
+        "celery.worker.consumer.gossip:Gossip",
+    )
+
+    def __init__(self, c, **kwargs):
+        super().__init__(c, **kwargs)
+        self.claimed = set()
+
+    def start(self, c):
+        # A worker started without -Q consumes every queue in task_queues,
+        # shards included; start from what it actually consumes.
+        shards = {queue.name for queue in c.app.conf.push_shard_queues}
+        self.claimed = {queue.name for queue in c.task_consumer.queues if queue.name in shards}
+        gossip = getattr(c, "gossip", None)
+        if gossip is None or not getattr(gossip, "enabled", True):
+            logger.warning("Gossip is disabled; claiming every push shard")
+        else:
+            gossip.on.node_join.add(self.on_membership_change)
+            gossip.on.node_leave.add(self.on_membership_change)
+            gossip.on.node_lost.add(self.on_membership_change)
+        self.consumer = c
+        self.rebalance()
+
+    def stop(self, c):
+        gossip = getattr(c, "gossip", None)
+        if gossip is not None:
+            for handlers in (gossip.on.node_join, gossip.on.node_leave, gossip.on.node_lost):
+                handlers.discard(self.on_membership_change)
+
+    def on_membership_change(self, worker):
+        self.rebalance()
+
+    def nodes(self):
+        c = self.consumer
+        nodes = {c.hostname}
+        gossip = getattr(c, "gossip", None)
+        if gossip is not None and getattr(gossip, "enabled", True):
+            group = node_group(c.hostname)
+            nodes.update(
+                worker.hostname
+                for worker in gossip.state.alive_workers()
+                if node_group(worker.hostname) == group
+            )
+        return sorted(nodes)
+
+    def rebalance(self):
+        c = self.consumer
+        shards = [queue.name for queue in c.app.conf.push_shard_queues]
+        nodes = self.nodes()
+        owned = set(assign_shards(shards, nodes)[c.hostname])
+
+        for name in sorted(owned - self.claimed):
+            c.add_task_queue(name)
+        for name in sorted(self.claimed - owned):
+            c.cancel_task_queue(name)
+        if owned != self.claimed:
+            logger.info(f"Claimed {len(owned)}/{len(shards)} push shards across {len(nodes)} worker(s)")
+        self.claimed = owned
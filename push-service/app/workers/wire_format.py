@@ -0,0 +1,132 @@
+"""
+Compact binary wire format for queue messages ("pushpack").
+
+Layout: one header byte followed by a msgpack document.
+
+- header 0x01: plain msgpack, 0x02: zlib-compressed msgpack
+- dict keys found in FIELD_NAMES are written as small integers
+- canonical UUID strings are written as 16-byte msgpack ext values
+- with template refs enabled, `template_body` / `template_subject` are dropped
+  when the message carries a `template_code`; consumers resolve the template
+  from the template service by code, which the push task already does
+
+Dict keys must be strings, as in JSON. The FIELD_NAMES table is part of the
+format: append new names, never reorder. `python -m benchmarks.wire_format`
+checks the round trip against a pinned encoding before it times anything.
+"""
+import uuid
+import zlib
+
+import msgpack
+
+CONTENT_TYPE = "application/x-push-msgpack"
+
+PLAIN = 0x01
+COMPRESSED = 0x02
+UUID_EXT = 1
+
+FIELD_NAMES = (
+    "notification_id",
+    "correlation_id",
+    "template_body",
+    "template_subject",
+    "template_code",
+    "recipient",
+    "user_contact",
+    "email",
+    "push_token",
+    "user_id",
+    "request_id",
+    "priority",
+    "notification_type",
+    "variables",
+    "name",
+    "link",
+    "meta",
+    "metadata",
+    "campaign_id",
+    "deliver_at",
+    "timezone",
+    "collapse_key",
+    "task",
+    "id",
+    "args",
+    "kwargs",
+)
+FIELD_CODES = {name: code for code, name in enumerate(FIELD_NAMES)}
+
+TEMPLATE_FIELDS = ("template_body", "template_subject")
+
+
+def _compact(value):
+    if isinstance(value, dict):
+        return {FIELD_CODES.get(key, key): _compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item) for item in value]
+    if isinstance(value, str) and len(value) == 36 and value[8] == "-":
+        try:
+            parsed = uuid.UUID(value)
+        except ValueError:
+            return value
+        if str(parsed) == value:
+            return msgpack.ExtType(UUID_EXT, parsed.bytes)
+    return value
+
+
+def _expand(value):
+    if isinstance(value, dict):
+        return {
+            FIELD_NAMES[key] if isinstance(key, int) and key < len(FIELD_NAMES) else key: _expand(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_expand(item) for item in value]
+    return value
+
+
+def _ext_hook(code, data):
+    if code == UUID_EXT:
+        return str(uuid.UUID(bytes=data))
+    return msgpack.ExtType(code, data)
+
+
+def _strip_message(message):
+    if not isinstance(message, dict) or not message.get("template_code"):
+        return message
+    if not any(field in message for field in TEMPLATE_FIELDS):
+        return message
+    return {key: value for key, value in message.items() if key not in TEMPLATE_FIELDS}
+
+
+def strip_templates(data):
+    """
+    Drop inline template text from messages that name a template_code, which
+    the worker resolves through the template service anyway. Applies to a
+    plain message or to the args of a Celery task body (protocol 1 or 2).
+    """
+    if isinstance(data, dict) and "task" in data:
+        return dict(data, args=[_strip_message(arg) for arg in data.get("args") or []])
+    if isinstance(data, (list, tuple)) and len(data) == 3 and isinstance(data[0], (list, tuple)):
+        args, kwargs, embed = data
+        return [[_strip_message(arg) for arg in args], kwargs, embed]
+    return _strip_message(data)
+
+
+def encode(data, compress_threshold=1024, template_refs=True) -> bytes:
+    if template_refs:
+        data = strip_templates(data)
+    packed = msgpack.packb(_compact(data), use_bin_type=True)
+    if compress_threshold and len(packed) >= compress_threshold:
+        compressed = zlib.compress(packed, 1)
+        if len(compressed) < len(packed):
+            return bytes([COMPRESSED]) + compressed
+    return bytes([PLAIN]) + packed
+
+
+def decode(body: bytes):
+    header, payload = body[0], body[1:]
+    if header == COMPRESSED:
+        payload = zlib.decompress(payload)
+    elif header != PLAIN:
+        raise ValueError(f"Unknown pushpack header byte: {header:#x}")
+    return _expand(msgpack.unpackb(payload, raw=False, ext_hook=_ext_hook, strict_map_key=False))
@@ -1,35 +1,74 @@
 import json
+import logging
+import os
 import ssl
+import threading
+import time
 import uuid
+from kombu import Exchange, Queue
 from kombu.serialization import register
 import certifi
 from celery import Celery
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
+from celery.worker.control import control_command, inspect_command
 
 from app.config.logging_config import setup_logging
-from app.config.worker_config import RABBITMQ_URL
-from app.schemas.NotificationSchema import PushRequest
+from app.config.worker_config import (
+    COALESCE_MAX_KEYS,
+    COALESCE_MAX_LINES,
+    COALESCE_WINDOW_SECONDS,
+    RABBITMQ_URL,
+    SCHEDULE_QUEUE_NAME,
+    SCHEDULER_TICK_SECONDS,
+    SHARD_COUNT,
+    SHARD_EXCHANGE_NAME,
+    DEAD_TOKEN_MAX_ENTRIES,
+    TOKEN_PRUNE_BATCH_SIZE,
+    TOKEN_PRUNE_INTERVAL_SECONDS,
+    TOKEN_PRUNING,
+    USER_MAX_PUSHES_PER_INTERVAL,
+    USER_PUSH_INTERVAL_SECONDS,
+    WIRE_COMPRESS_THRESHOLD,
+    WIRE_FORMAT,
+    WIRE_TEMPLATE_REFS,
+)
+from app.scheduler.scheduler import DELIVER_AT_ERRORS, parse_deliver_at
+from app.services.coalescer import PushCoalescer, UserCap
 from app.services.fetch_push_token import get_push_token
 from app.services.fetch_template import get_template
+from app.services.http_client import get_session
 
-from app.services.notifier import send_notification
+from app.services.notifier import get_firebase_app, send_notification
+from app.services.profiler import profiler
 from app.services.render_template import render_template
+from app.services.token_pruner import TokenPruner, prune_stats
+from app.workers import wire_format
+from app.workers.sharding import ShardClaimer, shard_exchange, shard_queues
 
-logger = setup_logging()
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 def rawjson_dumps(data):
     """Serialize Python objects to JSON string."""
     return json.dumps(data)
 
-def rawjson_loads(s):
+def as_task_envelope(data):
     """
-    Deserialize JSON message.
-    If the producer sent plain JSON (no 'task' field),
+    If the producer sent a plain push message (no 'task' field, has 'user_id'),
     wrap it into a fake Celery task envelope so Celery can execute it.
+    Celery-formatted payloads (protocol 1 dicts with 'task',
+    protocol 2 [args, kwargs, embed] lists) are returned unchanged, and so is
+    other JSON traffic decoded through this serializer, such as remote control
+    commands, their replies and events.
     """
-    data = json.loads(s)
-    # If message already Celery-formatted, just return
-    if isinstance(data, dict) and "task" in data:
+    if not isinstance(data, dict) or "task" in data or "user_id" not in data:
         return data
     # Otherwise, wrap raw payload as args to 'push'
     return {
@@ -39,6 +78,10 @@ def rawjson_loads(s):
         "kwargs": {},
     }
 
+def rawjson_loads(s):
+    """Deserialize JSON message, wrapping plain payloads in a task envelope."""
+    return as_task_envelope(json.loads(s))
+
 register(
     "rawjson",
     rawjson_dumps,
@@ -47,6 +90,27 @@ register(
     content_encoding="utf-8",
 )
 
+
+def pushpack_dumps(data):
+    """Serialize Python objects to the compact pushpack binary format."""
+    return wire_format.encode(
+        data,
+        compress_threshold=WIRE_COMPRESS_THRESHOLD,
+        template_refs=WIRE_TEMPLATE_REFS,
+    )
+
+def pushpack_loads(body):
+    """Deserialize a pushpack message, wrapping plain payloads in a task envelope."""
+    return as_task_envelope(wire_format.decode(body))
+
+register(
+    "pushpack",
+    pushpack_dumps,
+    pushpack_loads,
+    content_type=wire_format.CONTENT_TYPE,
+    content_encoding="binary",
+)
+
 celery_app = Celery(
     "push_service",
     broker=RABBITMQ_URL,
@@ -57,11 +121,213 @@ celery_app = Celery(
 )
 
 celery_app.conf.update(
-    task_serializer="rawjson",
-    accept_content=["json", "rawjson"],
+    task_serializer=WIRE_FORMAT,
+    accept_content=["json", "rawjson", "pushpack"],
     result_serializer="json",
 )
 
+PUSH_QUEUE = Queue("push.queue", routing_key="push.queue")
+SCHEDULE_QUEUE = Queue(SCHEDULE_QUEUE_NAME, Exchange(SCHEDULE_QUEUE_NAME), routing_key=SCHEDULE_QUEUE_NAME)
+SHARD_EXCHANGE = shard_exchange(SHARD_EXCHANGE_NAME)
+SHARD_QUEUES = shard_queues(SHARD_EXCHANGE, SHARD_COUNT)
+
+if SHARD_QUEUES:
+    celery_app.conf.task_queues = [
+        Queue("push.queue", Exchange("push.queue"), routing_key="push.queue"),
+        *SHARD_QUEUES,
+    ]
+    celery_app.conf.push_shard_queues = SHARD_QUEUES
+    celery_app.steps["consumer"].add(ShardClaimer)
+
+
+def _publish(messages, exchange, routing_key, declare):
+    with celery_app.producer_or_acquire() as producer:
+        for message in messages:
+            producer.publish(
+                message,
+                exchange=exchange,
+                routing_key=routing_key(message),
+                serializer=WIRE_FORMAT,
+                delivery_mode="persistent",
+                declare=declare,
+                retry=True,
+            )
+
+
+def publish_messages(messages, queue: Queue):
+    """Publish raw push messages, in the API gateway's format, over one producer."""
+    _publish(messages, queue.exchange, lambda message: queue.routing_key, [queue])
+
+
+def publish_sharded(messages):
+    """Publish push messages to the shard exchange, hashed by user_id."""
+    _publish(messages, SHARD_EXCHANGE, lambda message: str(message.get("user_id")), [SHARD_EXCHANGE, *SHARD_QUEUES])
+
+
+def publish_push(messages):
+    """Publish push messages for delivery, to the shards when sharding is enabled."""
+    if SHARD_QUEUES:
+        publish_sharded(messages)
+    else:
+        publish_messages(messages, PUSH_QUEUE)
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Warm provider clients in each child after fork, before it takes tasks."""
+    get_session()
+    try:
+        get_firebase_app()
+    except Exception as e:
+        logger.error(f"Failed to initialize Firebase app: {e}")
+
+
+# Created before the pool forks, so the cap holds across every process on the node
+user_cap = (
+    UserCap(USER_MAX_PUSHES_PER_INTERVAL, USER_PUSH_INTERVAL_SECONDS)
+    if USER_MAX_PUSHES_PER_INTERVAL > 0 else None
+)
+
+_coalescer_lock = threading.Lock()
+_coalescer = None
+_coalescer_pid = None
+
+
+def get_coalescer():
+    """Per-process coalescer, or None when PUSH_COALESCE_WINDOW_SECONDS is 0."""
+    global _coalescer, _coalescer_pid
+    if COALESCE_WINDOW_SECONDS <= 0:
+        return None
+
+    pid = os.getpid()
+    with _coalescer_lock:
+        if _coalescer is None or _coalescer_pid != pid:
+            _coalescer = PushCoalescer(
+                deliver=deliver_coalesced,
+                window=COALESCE_WINDOW_SECONDS,
+                cap=user_cap,
+                max_keys=COALESCE_MAX_KEYS,
+                max_lines=COALESCE_MAX_LINES,
+            )
+            _coalescer_pid = pid
+        return _coalescer
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_coalescer(**kwargs):
+    """Deliver everything still buffered before the process exits."""
+    global _coalescer
+    with _coalescer_lock:
+        coalescer, _coalescer = _coalescer, None
+    if coalescer is not None and _coalescer_pid == os.getpid():
+        coalescer.close()
+
+
+_pruner_lock = threading.Lock()
+_pruner = None
+_pruner_pid = None
+
+
+def get_token_pruner():
+    """Per-process dead-token pruner, or None when PUSH_TOKEN_PRUNING is off."""
+    global _pruner, _pruner_pid
+    if not TOKEN_PRUNING:
+        return None
+
+    pid = os.getpid()
+    with _pruner_lock:
+        if _pruner is None or _pruner_pid != pid:
+            _pruner = TokenPruner(
+                batch_size=TOKEN_PRUNE_BATCH_SIZE,
+                interval=TOKEN_PRUNE_INTERVAL_SECONDS,
+                max_entries=DEAD_TOKEN_MAX_ENTRIES,
+            )
+            _pruner_pid = pid
+        return _pruner
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_token_pruner(**kwargs):
+    """Send pending dead tokens to user-service before the process exits."""
+    global _pruner
+    with _pruner_lock:
+        pruner, _pruner = _pruner, None
+    if pruner is not None and _pruner_pid == os.getpid():
+        logger.info(f"Push token pruning stats: {pruner.stats()}")
+        pruner.close()
+
+
+@inspect_command()
+def token_pruning_stats(state):
+    """Send and pruning totals across this worker's pool: `celery -A app.workers.worker inspect token_pruning_stats`."""
+    return prune_stats()
+
+
+def deliver_push(user_id, title, body, collapse_key=None):
+    """Look up the user's push token and send one notification, unless FCM already rejected it."""
+    from app.schemas.NotificationSchema import PushRequest
+
+    push_payload = PushRequest(title=title, body=body)
+
+    with profiler.stage("fetch_token"):
+        token = get_push_token(user_id)
+    push_token = token.get("token")
+
+    pruner = get_token_pruner()
+    if pruner is not None and pruner.is_dead(push_token):
+        pruner.record_send(skipped=True)
+        return {"success": False, "error": "push token was rejected by FCM", "error_code": "TOKEN_PRUNED"}
+
+    with profiler.stage("send"):
+        result = send_notification(push_payload, push_token, collapse_key=collapse_key)
+
+    if pruner is not None:
+        pruner.record_send()
+        if result.get("token_invalid"):
+            pruner.mark_dead(user_id, push_token, result["error_code"])
+    return result
+
+
+def deliver_coalesced(user_id, collapse_key, title, body, count):
+    result = deliver_push(user_id, title, body, collapse_key=collapse_key)
+    if result.get("success"):
+        logger.info(f"Digest push of {count} notification(s) sent to user {user_id}")
+    else:
+        logger.warning(f"Digest push of {count} notification(s) failed for user {user_id}. Response: {result}")
+
+
+@task_prerun.connect
+def profile_task_start(task_id=None, task=None, **kwargs):
+    profiler.begin(task.name, task_id)
+
+
+@task_postrun.connect
+def profile_task_end(**kwargs):
+    profiler.end()
+
+
+@control_command(
+    args=[("sample_rate", float), ("slow_ms", float)],
+    signature="[sample_rate [slow_ms]]",
+)
+def profiler_enable(state, sample_rate=None, slow_ms=None):
+    """Start the sampling profiler in every pool process: `celery -A app.workers.worker control profiler_enable 0.1 500`."""
+    return profiler.enable(sample_rate, None if slow_ms is None else slow_ms / 1000)
+
+
+@control_command()
+def profiler_disable(state):
+    return profiler.disable()
+
+
+@inspect_command(args=[("limit", int)], signature="[limit]")
+def profiler_dump(state, limit=10):
+    """Merge the pool's folded stacks into PROFILER_OUTPUT_DIR and return the slowest tasks."""
+    return profiler.dump(limit)
+
+
 @celery_app.task(name="push", queue="push.queue")
 def push(message: dict):
     logger.info(f"Received push message: {message}")
@@ -71,24 +337,41 @@ def push(message: dict):
         name = message.get('name')
         template_code = message.get("template_code", "TEMPLATE_001")
 
+        try:
+            deliver_at = parse_deliver_at(message)
+        except DELIVER_AT_ERRORS as e:
+            logger.warning(f"Invalid deliver_at {message.get('deliver_at')!r} for user {user_id}, sending now: {e}")
+            deliver_at = None
+        if deliver_at is not None and deliver_at > time.time() + SCHEDULER_TICK_SECONDS:
+            publish_messages([message], SCHEDULE_QUEUE)
+            logger.info(f"Scheduled push for user {user_id} at {message['deliver_at']}")
+            return
+
+        # Messages arriving on push.queue are re-routed so each user lands on one shard
+        if SHARD_QUEUES and (push.request.delivery_info or {}).get("exchange") != SHARD_EXCHANGE.name:
+            publish_sharded([message])
+            logger.info(f"Routed push for user {user_id} to shard exchange {SHARD_EXCHANGE.name}")
+            return
 
         # build notif message details
-        template = get_template(template_code)
+        with profiler.stage("fetch_template"):
+            template = get_template(template_code)
 
         title = template.get("subject")
-        body = render_template(template.get("body"), context={"name": name})
-
-        logger.info(f"Sending push notif: {title}, {body} to {name}")
+        with profiler.stage("render"):
+            body = render_template(template.get("body"), context={"name": name})
 
+        coalescer = get_coalescer()
+        if coalescer is not None:
+            collapse_key = message.get("collapse_key") or template_code
+            with profiler.stage("coalesce"):
+                coalescer.add(user_id, collapse_key, title, body)
+            logger.info(f"Buffered push notif for user {user_id} under collapse key {collapse_key}")
+            return
 
+        logger.info(f"Sending push notif: {title}, {body} to {name}")
 
-        # get push token
-        push_payload = PushRequest(title=title, body=body)
-
-        token = get_push_token(user_id)
-        push_token = token.get("token")
-
-        result = send_notification(push_payload, push_token)
+        result = deliver_push(user_id, title, body, collapse_key=message.get("collapse_key"))
 
         if result.get("success"):
             logger.info(f"Push notification sent successfully for message: {message}")
@@ -0,0 +1,178 @@
+"""
+Offline end-to-end benchmark of the `push` task.
+
+Runs the full pipeline (serializer -> template fetch -> render -> token fetch -> FCM send)
+against in-process fakes, so no RabbitMQ, user/template service or Firebase project is needed.
+
+    python -m benchmarks.e2e_push --messages 2000 --concurrency 8
+    python -m benchmarks.e2e_push --replay messages.jsonl --template-latency-ms 5
+    python -m benchmarks.e2e_push --dead-token-rate 0.2 --fcm-latency-ms 20
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+from requests import HTTPError
+
+from benchmarks.fakes import InMemoryBroker, StubServiceServer, fake_push_token, install_fake_firebase
+from benchmarks.stats import StageTimer, print_table
+
+NAMES = ["Alice Johnson", "Bob Smith", "Charlie Davis", "Diana Evans", "Ethan Williams"]
+
+
+def synthetic_messages(count: int, users: int, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        user_id = f"u{rng.randrange(users):06d}"
+        name = rng.choice(NAMES)
+        yield {
+            "notification_id": str(uuid.uuid4()),
+            "correlation_id": str(uuid.uuid4()),
+            "template_body": "Hello {{name}}, welcome to our platform!",
+            "template_subject": "Welcome Email",
+            "template_code": "TEMPLATE_001",
+            "recipient": f"{user_id}@example.com",
+            "user_contact": {"email": f"{user_id}@example.com", "push_token": None},
+            "user_id": user_id,
+            "name": name,
+            "request_id": f"req-{uuid.uuid4()}",
+            "priority": 1,
+            "notification_type": "push",
+            "variables": {
+                "name": name,
+                "link": "https://example.com/welcome",
+                "meta": {"key": "value"},
+            },
+            "metadata": {"campaign_id": "benchmark"},
+        }
+
+
+def replay_messages(path: str):
+    """Yield push messages from a JSONL file (raw payloads or Celery envelopes)."""
+    with open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if isinstance(data, dict) and "task" in data:
+                data = data["args"][0]
+            yield data
+
+
+def instrument_worker(worker, timer: StageTimer):
+    """Wrap the stage functions the push task looks up in the worker module."""
+    worker.get_template = timer.wrap("fetch_template", worker.get_template)
+    worker.render_template = timer.wrap("render", worker.render_template)
+    worker.get_push_token = timer.wrap("fetch_token", worker.get_push_token)
+    worker.send_notification = timer.wrap("send", worker.send_notification)
+
+
+def dead_tokens(users: int, rate: float, seed: int):
+    """Tokens of a random `rate` share of the synthetic users, as FCM would report them unregistered."""
+    rng = random.Random(seed)
+    return {fake_push_token(f"u{index:06d}") for index in range(users) if rng.random() < rate}
+
+
+def run(args):
+    dead = dead_tokens(args.users, args.dead_token_rate, args.seed)
+    sent = install_fake_firebase(send_latency=args.fcm_latency_ms / 1000, unregistered=dead.__contains__)
+
+    with StubServiceServer(
+        template_latency=args.template_latency_ms / 1000,
+        user_latency=args.user_latency_ms / 1000,
+    ) as stub:
+        os.environ["USER_SERVICE_URL"] = stub.url
+        os.environ["TEMPLATE_SERVICE_URL"] = stub.url
+        os.environ.setdefault("RABBITMQ_URL", "memory://")
+        os.environ["PUSH_COALESCE_WINDOW_SECONDS"] = str(args.coalesce_window_ms / 1000)
+        os.environ["FCM_TOKEN"] = ""
+
+        from app.workers import worker
+
+        logging.getLogger().setLevel(args.log_level)
+
+        timer = StageTimer()
+        instrument_worker(worker, timer)
+        broker = InMemoryBroker(serializer=args.serializer)
+
+        if args.replay:
+            messages = replay_messages(args.replay)
+        else:
+            messages = synthetic_messages(args.messages, args.users, args.seed)
+
+        total_bytes = 0
+        published = 0
+        for message in messages:
+            with timer.stage("encode"):
+                total_bytes += broker.publish(message)
+            published += 1
+
+        failures = []
+
+        def consume():
+            while True:
+                start = time.perf_counter()
+                envelope = broker.get(timeout=0.05)
+                if envelope is None:
+                    return
+                timer.record("decode", time.perf_counter() - start)
+                try:
+                    with timer.stage("task"):
+                        worker.push.run(*envelope["args"], **envelope["kwargs"])
+                except Exception as e:
+                    failures.append(e)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=consume) for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        worker.close_coalescer()
+        pruner = worker.get_token_pruner()
+        pruning = pruner.stats() if pruner is not None else None
+        worker.close_token_pruner()
+        elapsed = time.perf_counter() - started
+
+    print(f"messages: {published}  delivered: {len(sent)}  failed: {len(failures)}")
+    print(f"concurrency: {args.concurrency}  elapsed: {elapsed:.3f}s  "
+          f"throughput: {published / elapsed:.1f} msg/s")
+    if published:
+        print(f"serializer: {args.serializer}  bytes/message: {total_bytes / published:.1f}")
+    if pruning is not None and args.dead_token_rate:
+        print(f"dead tokens: {len(dead)}  sends attempted: {pruning['sends_attempted']}  "
+              f"skipped: {pruning['sends_skipped']}  pruned upstream: {len(stub.pruned)}  "
+              f"no token after prune: {sum(isinstance(e, HTTPError) for e in failures)}")
+    print()
+    order = ["encode", "decode", "fetch_template", "render", "fetch_token", "send", "task"]
+    rows = sorted(timer.summary(), key=lambda row: order.index(row["stage"]) if row["stage"] in order else len(order))
+    print_table(rows, ["stage", "count", "mean_ms", "p50_ms", "p99_ms"])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000, help="synthetic messages to send")
+    parser.add_argument("--users", type=int, default=100, help="distinct user ids in the synthetic load")
+    parser.add_argument("--replay", help="JSONL file of queue messages to replay instead of synthetic load")
+    parser.add_argument("--concurrency", type=int, default=4, help="consumer threads")
+    parser.add_argument("--serializer", default="rawjson", help="kombu serializer used on the fake broker")
+    parser.add_argument("--template-latency-ms", type=float, default=0.0)
+    parser.add_argument("--user-latency-ms", type=float, default=0.0)
+    parser.add_argument("--fcm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--dead-token-rate", type=float, default=0.0,
+                        help="share of synthetic users whose token FCM reports as unregistered")
+    parser.add_argument("--coalesce-window-ms", type=float, default=0.0,
+                        help="per-user coalescing window (0 sends every message individually)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
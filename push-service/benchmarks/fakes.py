@@ -0,0 +1,225 @@
+"""
+In-process stand-ins for the push pipeline's external dependencies.
+
+- InMemoryBroker: a queue that encodes/decodes through the registered kombu serializers
+- StubServiceServer: user-service and template-service HTTP endpoints with configurable latency,
+  including the push-token prune endpoint
+- install_fake_firebase: a fake firebase_admin package whose messaging.send sleeps instead of calling FCM,
+  and rejects tokens it is told are unregistered
+"""
+import json
+import queue
+import re
+import sys
+import threading
+import time
+import types
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from kombu.serialization import dumps, loads
+
+
+class InMemoryBroker:
+    """Broker stand-in that round-trips messages through a kombu serializer."""
+
+    def __init__(self, serializer="rawjson"):
+        self.serializer = serializer
+        self._queue = queue.Queue()
+
+    def publish(self, message: dict):
+        content_type, content_encoding, body = dumps(message, serializer=self.serializer)
+        self._queue.put((body, content_type, content_encoding))
+        return len(body)
+
+    def get(self, timeout=None):
+        """Return the decoded payload of the next message, or None when empty."""
+        try:
+            body, content_type, content_encoding = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return loads(body, content_type, content_encoding, accept=[content_type])
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+TEMPLATE_PATH = re.compile(r"^/api/v1/templates/(?P<code>[^/]+)$")
+PUSH_TOKEN_PATH = re.compile(r"^/api/v1/users/(?P<user_id>[^/]+)/push-token$")
+PRUNE_PATH = "/api/v1/users/push-tokens/prune"
+
+
+def fake_push_token(user_id: str) -> str:
+    return f"fake-token-{user_id}"
+
+
+def _make_handler(template_latency: float, user_latency: float, pruned: set):
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            match = TEMPLATE_PATH.match(self.path)
+            if match:
+                time.sleep(template_latency)
+                return self._send_json({
+                    "id": str(uuid.uuid5(uuid.NAMESPACE_URL, match["code"])),
+                    "template_code": match["code"],
+                    "version": 1,
+                    "subject": "Welcome Email",
+                    "body": "Hello {{name}}, welcome to our platform!",
+                    "language": "en",
+                })
+
+            match = PUSH_TOKEN_PATH.match(self.path)
+            if match:
+                time.sleep(user_latency)
+                token = fake_push_token(match["user_id"])
+                if token in pruned:
+                    return self._send_json({"detail": "No push tokens found for this user"}, status=404)
+                return self._send_json({
+                    "id": str(uuid.uuid4()),
+                    "user_id": match["user_id"],
+                    "token": token,
+                    "created_at": "2025-01-01T00:00:00",
+                })
+
+            self._send_json({"detail": "Not Found"}, status=404)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path == PRUNE_PATH:
+                tokens = set(json.loads(body)["tokens"])
+                fresh = tokens - pruned
+                pruned.update(fresh)
+                return self._send_json({"success": True, "data": {"pruned": len(fresh)}, "message": "pruned", "meta": {}})
+
+            self._send_json({"detail": "Not Found"}, status=404)
+
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+class StubServiceServer:
+    """Serves the template and push-token endpoints on a local port."""
+
+    def __init__(self, template_latency: float = 0.0, user_latency: float = 0.0):
+        self.pruned = set()
+        handler = _make_handler(template_latency, user_latency, self.pruned)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def install_fake_firebase(send_latency: float = 0.0, unregistered=lambda token: False):
+    """
+    Register a fake firebase_admin package in sys.modules.
+
+    Must be called before the first notification is sent. Sends to tokens for
+    which `unregistered(token)` is true raise messaging.UnregisteredError.
+    Returns the list that every sent message is appended to.
+    """
+    sent = []
+
+    firebase_admin = types.ModuleType("firebase_admin")
+    credentials = types.ModuleType("firebase_admin.credentials")
+    exceptions = types.ModuleType("firebase_admin.exceptions")
+    messaging = types.ModuleType("firebase_admin.messaging")
+
+    class FirebaseError(Exception):
+        def __init__(self, code, message):
+            super().__init__(message)
+            self.code = code
+
+    class NotFoundError(FirebaseError):
+        def __init__(self, message):
+            super().__init__("NOT_FOUND", message)
+
+    class InvalidArgumentError(FirebaseError):
+        def __init__(self, message):
+            super().__init__("INVALID_ARGUMENT", message)
+
+    class PermissionDeniedError(FirebaseError):
+        def __init__(self, message):
+            super().__init__("PERMISSION_DENIED", message)
+
+    class UnregisteredError(NotFoundError):
+        pass
+
+    class SenderIdMismatchError(PermissionDeniedError):
+        pass
+
+    class Message:
+        def __init__(self, notification=None, token=None, **kwargs):
+            self.notification = notification
+            self.token = token
+            self.kwargs = kwargs
+
+    class Notification:
+        def __init__(self, title=None, body=None, **kwargs):
+            self.title = title
+            self.body = body
+
+    class AndroidConfig:
+        def __init__(self, collapse_key=None, **kwargs):
+            self.collapse_key = collapse_key
+
+    class APNSConfig:
+        def __init__(self, headers=None, **kwargs):
+            self.headers = headers
+
+    def send(message, dry_run=False, app=None):
+        time.sleep(send_latency)
+        if unregistered(message.token):
+            raise UnregisteredError("Requested entity was not found.")
+        sent.append(message)
+        return f"projects/fake/messages/{uuid.uuid4()}"
+
+    credentials.Certificate = lambda path: object()
+    exceptions.FirebaseError = FirebaseError
+    exceptions.NotFoundError = NotFoundError
+    exceptions.InvalidArgumentError = InvalidArgumentError
+    exceptions.PermissionDeniedError = PermissionDeniedError
+    messaging.UnregisteredError = UnregisteredError
+    messaging.SenderIdMismatchError = SenderIdMismatchError
+    messaging.Message = Message
+    messaging.Notification = Notification
+    messaging.AndroidConfig = AndroidConfig
+    messaging.APNSConfig = APNSConfig
+    messaging.send = send
+
+    firebase_admin.initialize_app = lambda cred=None, options=None, name="[DEFAULT]": object()
+    firebase_admin.credentials = credentials
+    firebase_admin.exceptions = exceptions
+    firebase_admin.messaging = messaging
+
+    sys.modules["firebase_admin"] = firebase_admin
+    sys.modules["firebase_admin.credentials"] = credentials
+    sys.modules["firebase_admin.exceptions"] = exceptions
+    sys.modules["firebase_admin.messaging"] = messaging
+
+    return sent
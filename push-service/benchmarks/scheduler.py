@@ -0,0 +1,101 @@
+"""
+Schedule/release throughput of the push scheduler.
+
+Schedules N messages spread over a time range into a temporary SQLite store,
+then drives a simulated clock tick by tick until everything is released,
+reporting throughput and the peak number of items held in memory.
+
+    python -m benchmarks.scheduler --items 1000000 --spread-hours 24
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from app.scheduler.scheduler import PushScheduler
+from app.scheduler.store import ScheduleStore
+
+
+class SimulatedClock:
+    def __init__(self, start: float):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def run(args):
+    start = 1_700_000_000.0
+    clock = SimulatedClock(start)
+    spread = args.spread_hours * 3600
+    released = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "scheduler.db"))
+        scheduler = PushScheduler(
+            store,
+            publish=released.extend,
+            horizon=args.horizon,
+            max_loaded=args.max_loaded,
+            batch_size=args.batch_size,
+            tick=args.tick,
+            clock=clock,
+        )
+
+        started = time.perf_counter()
+        for offset in range(0, args.items, args.batch_size):
+            batch = [
+                {
+                    "notification_id": str(uuid.uuid4()),
+                    "user_id": f"u{i % 100000:06d}",
+                    "template_code": "TEMPLATE_001",
+                    "deliver_at": start + (i * 7919 % args.items) / args.items * spread,
+                }
+                for i in range(offset, min(offset + args.batch_size, args.items))
+            ]
+            scheduler.schedule(batch)
+        schedule_elapsed = time.perf_counter() - started
+
+        if args.trace_memory:
+            tracemalloc.start()
+        peak_loaded = 0
+        ticks = 0
+        started = time.perf_counter()
+        while clock.now <= start + spread + args.tick:
+            clock.now += args.tick
+            scheduler.tick()
+            peak_loaded = max(peak_loaded, scheduler.loaded())
+            ticks += 1
+        release_elapsed = time.perf_counter() - started
+        peak_memory = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+        tracemalloc.stop()
+
+        remaining = store.count()
+        store.close()
+
+    print(f"items: {args.items}  spread: {args.spread_hours}h  tick: {args.tick}s  horizon: {args.horizon}s")
+    print(f"schedule: {schedule_elapsed:.2f}s  {args.items / schedule_elapsed:,.0f} items/s")
+    print(f"release:  {release_elapsed:.2f}s  {len(released) / release_elapsed:,.0f} items/s  "
+          f"({ticks} ticks, {release_elapsed / ticks * 1e6:.0f} us/tick)")
+    print(f"released: {len(released)}  left in store: {remaining}")
+    print(f"peak items in memory: {peak_loaded} (max_loaded {args.max_loaded})")
+    if peak_memory is not None:
+        print(f"peak traced memory during release: {peak_memory / 1e6:.1f} MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--spread-hours", type=float, default=24)
+    parser.add_argument("--tick", type=float, default=1.0)
+    parser.add_argument("--horizon", type=float, default=300.0)
+    parser.add_argument("--max-loaded", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--trace-memory", action="store_true", help="report peak allocations (slower)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,111 @@
+"""
+Cache hit rate and modelled throughput of shared vs. sharded push queues.
+
+Replays a skewed per-user message stream over N simulated worker nodes. Each
+node runs --processes pool processes, and each process has its own token
+cache (app.services.cache.TTLCache), as under the prefork pool:
+
+- shared:  every node competes for one queue, so any node may see any user
+- sharded: users are hashed to shards, shards are assigned to nodes by the
+           same rendezvous hashing the workers use (app.workers.sharding)
+
+A node hands its messages to its processes in turn. Throughput is modelled
+from per-message hit/miss costs and the busiest process. --processes 1 models
+a node with one shared cache (e.g. --pool threads).
+
+    python -m benchmarks.sharding --nodes 1 2 4 8 16 --processes 4 --cache-size 5000
+"""
+import argparse
+import hashlib
+import itertools
+import random
+
+from app.services.cache import TTLCache
+from app.workers.sharding import assign_shards
+from benchmarks.stats import print_table
+
+
+def user_stream(messages: int, users: int, skew: float, seed: int):
+    rng = random.Random(seed)
+    weights = [1 / (rank ** skew) for rank in range(1, users + 1)]
+    user_ids = [f"u{index:07d}" for index in range(users)]
+    rng.shuffle(user_ids)
+    return rng.choices(user_ids, weights=weights, k=messages)
+
+
+def user_shard(user_id: str, shards: int) -> int:
+    digest = hashlib.blake2b(user_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def simulate(stream, nodes: int, sharded: bool, args):
+    names = [f"push@node{index}" for index in range(nodes)]
+    processes = nodes * args.processes
+    caches = [TTLCache("tokens", args.cache_size, ttl=float("inf"), clock=lambda: 0.0) for _ in range(processes)]
+    busy = [0.0] * processes
+    # each node dispatches to its own processes in turn
+    dispatch = [itertools.cycle(range(node * args.processes, (node + 1) * args.processes)) for node in range(nodes)]
+
+    if sharded:
+        shards = [f"push.shard.{index}" for index in range(args.shards)]
+        owner = {}
+        for node_index, name in enumerate(names):
+            for shard in assign_shards(shards, names)[name]:
+                owner[int(shard.rsplit(".", 1)[1])] = node_index
+        route = lambda user_id: owner[user_shard(user_id, args.shards)]
+    else:
+        round_robin = itertools.cycle(range(nodes))
+        route = lambda user_id: next(round_robin)
+
+    for user_id in stream:
+        process = next(dispatch[route(user_id)])
+        cache = caches[process]
+        if cache.get(user_id) is None:
+            cache.set(user_id, True)
+            busy[process] += args.miss_ms
+        else:
+            busy[process] += args.hit_ms
+
+    hits = sum(cache.hits for cache in caches)
+    lookups = hits + sum(cache.misses for cache in caches)
+    makespan = max(busy) / 1000
+    return {
+        "nodes": nodes,
+        "topology": "sharded" if sharded else "shared",
+        "hit_rate": hits / lookups,
+        "msg_s": len(stream) / makespan if makespan else float("inf"),
+        "msg_s_per_node": len(stream) / makespan / nodes if makespan else float("inf"),
+        "max_vs_mean_load": max(busy) / (sum(busy) / processes),
+    }
+
+
+def run(args):
+    stream = user_stream(args.messages, args.users, args.skew, args.seed)
+    rows = []
+    for nodes in args.nodes:
+        for sharded in (False, True):
+            rows.append(simulate(stream, nodes, sharded, args))
+
+    print(f"messages: {args.messages}  users: {args.users}  skew: {args.skew}  "
+          f"processes/node: {args.processes}  cache/process: {args.cache_size}  shards: {args.shards}  "
+          f"hit: {args.hit_ms}ms  miss: {args.miss_ms}ms")
+    print_table(rows, ["nodes", "topology", "hit_rate", "msg_s", "msg_s_per_node", "max_vs_mean_load"])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--skew", type=float, default=0.8, help="Zipf exponent of per-user activity")
+    parser.add_argument("--processes", type=int, default=4, help="pool processes per node, each with its own cache")
+    parser.add_argument("--cache-size", type=int, default=5000, help="token cache entries per process")
+    parser.add_argument("--shards", type=int, default=256)
+    parser.add_argument("--hit-ms", type=float, default=0.5, help="cost of a message with a cached token")
+    parser.add_argument("--miss-ms", type=float, default=10.0, help="cost of a message that fetches its token")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
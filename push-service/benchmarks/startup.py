@@ -0,0 +1,88 @@
+"""
+Cold-start benchmark and import-time profile for a service entry point.
+
+Each run imports the entry module in a fresh interpreter with `-X importtime`,
+so the numbers match what a newly forked/spawned worker pays before its first task.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --module main --runs 20 --top 25
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.stats import print_table
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s*)(?P<name>\S+)$")
+
+
+def import_once(module: str):
+    """Import `module` in a fresh interpreter; return (wall seconds, importtime lines)."""
+    env = dict(os.environ)
+    env.setdefault("RABBITMQ_URL", "memory://")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVICE_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stderr.splitlines()
+
+
+def self_time_by_package(lines):
+    """Sum of self-import microseconds per top-level package."""
+    totals = {}
+    for line in lines:
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        root = match["name"].split(".")[0]
+        totals[root] = totals.get(root, 0) + int(match["self"])
+    return totals
+
+
+def run(args):
+    baseline = [import_once("sys")[0] for _ in range(args.runs)]
+    walls, profiles = [], []
+    for _ in range(args.runs):
+        elapsed, lines = import_once(args.module)
+        walls.append(elapsed)
+        profiles.append(self_time_by_package(lines))
+
+    interpreter = statistics.median(baseline)
+    print(f"entry point: {args.module}  runs: {args.runs}")
+    print(f"interpreter startup (median): {interpreter * 1000:.1f} ms")
+    print(f"import wall time    (median): {statistics.median(walls) * 1000:.1f} ms  "
+          f"min: {min(walls) * 1000:.1f} ms  max: {max(walls) * 1000:.1f} ms")
+    print(f"entry point cost    (median): {(statistics.median(walls) - interpreter) * 1000:.1f} ms")
+    print()
+
+    modules = set().union(*profiles)
+    rows = [
+        {"package": name, "self_ms": statistics.median(p.get(name, 0) for p in profiles) / 1000}
+        for name in modules
+    ]
+    rows.sort(key=lambda row: row["self_ms"], reverse=True)
+    print_table(rows[:args.top], ["package", "self_ms"])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.workers.worker", help="entry module to import")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,121 @@
+"""
+Bytes per message and encode/decode throughput of the queue wire formats.
+
+Before timing, checks that pushpack round-trips (UUID ext values, the
+compression header, Celery task envelopes) and that a fixed message still
+encodes to PINNED_PUSHPACK, so a reordered FIELD_NAMES table fails here.
+
+    python -m benchmarks.wire_format --messages 20000
+"""
+import argparse
+import time
+from functools import partial
+
+import msgpack
+
+from app.workers import wire_format
+from app.workers.worker import rawjson_dumps, rawjson_loads
+from benchmarks.e2e_push import synthetic_messages
+from benchmarks.stats import print_table
+
+
+NOTIFICATION_ID = "123e4567-e89b-12d3-a456-426614174000"
+PINNED_MESSAGE = {"notification_id": NOTIFICATION_ID, "template_code": "T1", "deliver_at": 1.5, "kwargs": {}}
+PINNED_PUSHPACK = "018400d801123e4567e89b12d3a45642661417400004a2543113cb3ff80000000000001980"
+
+
+def _expect(actual, expected, what):
+    if actual != expected:
+        raise AssertionError(f"pushpack {what}: expected {expected!r}, got {actual!r}")
+
+
+def check_round_trip():
+    """Raise AssertionError if pushpack does not decode to what was encoded."""
+    _expect(wire_format.encode(PINNED_MESSAGE).hex(), PINNED_PUSHPACK, "pinned encoding")
+
+    message = {
+        "notification_id": NOTIFICATION_ID,
+        "user_id": NOTIFICATION_ID.upper(),
+        "request_id": "not-a-uuid-but-exactly-36-characters",
+        "template_code": "WELCOME",
+        "template_body": "Hi {{ name }}",
+        "template_subject": "Welcome",
+        "variables": {"name": "Ada", "meta": {"unknown_field": [1, "two", None]}},
+        "priority": 2,
+    }
+    plain = wire_format.encode(message, template_refs=False)
+    _expect(plain[0], wire_format.PLAIN, "header")
+    _expect(wire_format.decode(plain), message, "plain round trip")
+    _expect(msgpack.unpackb(plain[1:], raw=False, strict_map_key=False)[0],
+            msgpack.ExtType(wire_format.UUID_EXT, bytes.fromhex(NOTIFICATION_ID.replace("-", ""))), "UUID ext")
+
+    large = dict(message, variables={"name": "Ada " * 1000})
+    compressed = wire_format.encode(large, compress_threshold=64, template_refs=False)
+    _expect(compressed[0], wire_format.COMPRESSED, "compressed header")
+    _expect(wire_format.decode(compressed), large, "compressed round trip")
+    _expect(wire_format.encode(large, compress_threshold=0, template_refs=False)[0], wire_format.PLAIN,
+            "header with compression off")
+
+    stripped = {key: value for key, value in message.items() if key not in wire_format.TEMPLATE_FIELDS}
+    _expect(wire_format.decode(wire_format.encode(message)), stripped, "stripped message")
+    task = {"task": "push", "id": NOTIFICATION_ID, "args": [message], "kwargs": {}}
+    _expect(wire_format.decode(wire_format.encode(task)), dict(task, args=[stripped]), "protocol 1 task")
+    body = ([message], {}, {"callbacks": None})
+    _expect(wire_format.decode(wire_format.encode(body)), [[stripped], {}, {"callbacks": None}], "protocol 2 task")
+
+    try:
+        wire_format.decode(b"\x7f" + plain[1:])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("pushpack accepted an unknown header byte")
+
+
+def variants():
+    return {
+        "rawjson": (rawjson_dumps, rawjson_loads),
+        "msgpack": (partial(msgpack.packb, use_bin_type=True), partial(msgpack.unpackb, raw=False)),
+        "pushpack": (partial(wire_format.encode, template_refs=False), wire_format.decode),
+        "pushpack+strip": (wire_format.encode, wire_format.decode),
+        "pushpack+strip+zlib": (partial(wire_format.encode, compress_threshold=1), wire_format.decode),
+    }
+
+
+def run(args):
+    check_round_trip()
+    messages = list(synthetic_messages(args.messages, args.users))
+    rows = []
+    for name, (dumps, loads) in variants().items():
+        started = time.perf_counter()
+        bodies = [dumps(message) for message in messages]
+        encode_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for body in bodies:
+            loads(body)
+        decode_elapsed = time.perf_counter() - started
+
+        size = sum(len(body.encode() if isinstance(body, str) else body) for body in bodies) / len(bodies)
+        rows.append({
+            "format": name,
+            "bytes_per_msg": size,
+            "encode_msg_s": len(bodies) / encode_elapsed,
+            "decode_msg_s": len(bodies) / decode_elapsed,
+        })
+
+    baseline = rows[0]["bytes_per_msg"]
+    for row in rows:
+        row["vs_rawjson"] = row["bytes_per_msg"] / baseline
+    print(f"messages: {args.messages}  pushpack round trip: ok")
+    print_table(rows, ["format", "bytes_per_msg", "vs_rawjson", "encode_msg_s", "decode_msg_s"])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -4,9 +4,11 @@ from app.config.logging_config import setup_logging
 setup_logging()
 
 from app.routers.router import router
+from app.routers import profiler
 
 app = FastAPI(title='Push Notification Service')
 app.include_router(router)
+app.include_router(profiler.router)
 
 @app.get('/')
 def read_root():
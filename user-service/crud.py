@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 
 import schemas
 from auth import get_password_hash, verify_password
+from cache import cache_key, invalidate_user, push_token_cache, user_cache
 from models import PushToken, User
 from schemas import UserCreate
 
@@ -14,6 +15,18 @@ def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 
+def get_cached_user(db: Session, user_id: str) -> schemas.UserOut | None:
+    """Read-through cached `UserOut` for a user, or None if it does not exist."""
+
+    def load():
+        user = get_user(db, user_id)
+        if not user:
+            return None
+        return schemas.UserOut.model_validate(user, from_attributes=True)
+
+    return user_cache.get_or_load(cache_key(user_id), load)
+
+
 def get_users(db: Session):
     return db.query(User).all()
 
@@ -26,13 +39,53 @@ def add_push_token(db: Session, user_id: str, token_data: schemas.PushTokenData)
     db.add(db_token)
     db.commit()
     db.refresh(db_token)
+    invalidate_user(user_id)
+    return db_token
+
+
+def update_push_token(db: Session, db_token: PushToken, token: str):
+    db_token.token = token
+    db.commit()
+    db.refresh(db_token)
+    invalidate_user(db_token.user_id)
     return db_token
 
 
+def prune_push_tokens(db: Session, tokens: list[str]) -> int:
+    """Delete the given push tokens in one statement; returns how many existed."""
+    if not tokens:
+        return 0
+    user_ids = [
+        row.user_id
+        for row in db.query(PushToken.user_id).filter(PushToken.token.in_(tokens))
+    ]
+    if not user_ids:
+        return 0
+    db.query(PushToken).filter(PushToken.token.in_(tokens)).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    return len(user_ids)
+
+
 def get_user_push_tokens(db: Session, user_id: int):
     return db.query(PushToken).filter(PushToken.user_id == user_id).first()
 
 
+def get_cached_push_token(db: Session, user_id: str) -> schemas.PushTokenOut | None:
+    """Read-through cached `PushTokenOut` for a user, or None if they have none."""
+
+    def load():
+        token = get_user_push_tokens(db, user_id)
+        if not token:
+            return None
+        return schemas.PushTokenOut.model_validate(token, from_attributes=True)
+
+    return push_token_cache.get_or_load(cache_key(user_id), load)
+
+
 def update_user(db: Session, user_id: int, updates: UserCreate):
     db_user = get_user(db, user_id)
     if not db_user:
@@ -48,6 +101,7 @@ def update_user(db: Session, user_id: int, updates: UserCreate):
 
     db.commit()
     db.refresh(db_user)
+    invalidate_user(user_id)
     return db_user
 
 
@@ -2,9 +2,10 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from cache import cache_stats
 from database import engine
 from models import Base as ModelsBase
-from routers import users
+from routers import profiler, users
 
 load_dotenv()
 ModelsBase.metadata.create_all(bind=engine)
@@ -22,6 +23,7 @@ app.add_middleware(
 
 # Versioned API routes
 app.include_router(users.router, prefix="/api/v1")
+app.include_router(profiler.router)
 
 
 @app.get("/health")
@@ -29,6 +31,11 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    return {"caches": cache_stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
 
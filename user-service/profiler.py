@@ -0,0 +1,188 @@
+"""
+Runtime-toggleable sampling profiler for request handlers.
+
+This is a trimmed, in-memory variant of push-service's
+app/services/profiler.py. The services are built and deployed from their own
+directories, so they cannot import each other's code, and this service runs
+as one uvicorn process, so it needs none of the cross-process plumbing
+(shared-memory switch, per-process files) the Celery worker does.
+
+While enabled, a background thread samples the stacks of a `sample_rate`
+share of requests into flamegraph-compatible folded lines, and requests
+slower than `slow_threshold` are kept with their stage timings and stacks.
+When disabled, `begin`, `end` and `stage` reduce to a single check.
+"""
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_DEPTH = 128
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _Record:
+    __slots__ = ("name", "started", "sampled", "stages", "stacks")
+
+    def __init__(self, name, sampled):
+        self.name = name
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.stages = []
+        self.stacks = Counter()
+
+    def as_dict(self, duration, in_flight=False):
+        return {
+            "name": self.name,
+            "duration_ms": round(duration * 1000, 3),
+            "in_flight": in_flight,
+            "stages": [{"stage": name, "ms": round(elapsed * 1000, 3)} for name, elapsed in self.stages],
+            "stacks": [f"{stack} {count}" for stack, count in self.stacks.most_common()],
+        }
+
+
+def fold_stack(frame):
+    """Collapse a frame chain into 'outer;...;inner' using module:qualname frames."""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    def __init__(self, interval=0.01, sample_rate=0.1, slow_threshold=1.0, max_slow=100):
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._active = {}
+        self._stacks = Counter()
+        self._slow = deque(maxlen=max_slow)
+        self._sampler = None
+
+    def enable(self, sample_rate=None, slow_threshold=None):
+        """Discard earlier samples and start sampling."""
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if slow_threshold is not None:
+                self.slow_threshold = slow_threshold
+            self._stacks.clear()
+            self._slow.clear()
+            self.enabled = True
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._run, name="users-profiler", daemon=True)
+                self._sampler.start()
+        return self.status()
+
+    def disable(self):
+        self.enabled = False
+        return self.status()
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "interval_ms": self.interval * 1000,
+        }
+
+    def begin(self, name):
+        if not self.enabled:
+            return
+        self._active[threading.get_ident()] = _Record(name, random.random() < self.sample_rate)
+
+    def end(self):
+        if not self._active:
+            return
+        record = self._active.pop(threading.get_ident(), None)
+        if record is None:
+            return
+        duration = time.perf_counter() - record.started
+        if duration >= self.slow_threshold:
+            with self._lock:
+                self._slow.append(record.as_dict(duration))
+
+    def stage(self, name):
+        """Context manager timing one stage of the current request."""
+        if not self._active:
+            return _NULL_STAGE
+        record = self._active.get(threading.get_ident())
+        if record is None:
+            return _NULL_STAGE
+        return _Stage(record, name)
+
+    def folded(self):
+        with self._lock:
+            return [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+
+    def slow(self, limit=20):
+        """Slowest finished requests, plus running ones already past the threshold."""
+        now = time.perf_counter()
+        with self._lock:
+            units = list(self._slow) + [
+                record.as_dict(now - record.started, in_flight=True)
+                for record in list(self._active.values())
+                if now - record.started >= self.slow_threshold
+            ]
+        units.sort(key=lambda unit: unit["duration_ms"], reverse=True)
+        return units[:limit]
+
+    def _run(self):
+        own = threading.get_ident()
+        while self.enabled:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            with self._lock:
+                for ident, record in list(self._active.items()):
+                    frame = frames.get(ident)
+                    if frame is None or ident == own:
+                        continue
+                    if record.sampled:
+                        stack = fold_stack(frame)
+                        record.stacks[stack] += 1
+                        self._stacks[f"{record.name};{stack}"] += 1
+                    elif not record.stacks and now - record.started >= self.slow_threshold:
+                        record.stacks[fold_stack(frame)] += 1
+            del frames
+
+
+class _Stage:
+    __slots__ = ("record", "name", "started")
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record.stages.append((self.name, time.perf_counter() - self.started))
+        return False
+
+
+profiler = Profiler(
+    interval=float(os.getenv("PROFILER_INTERVAL_MS", "10")) / 1000,
+    sample_rate=float(os.getenv("PROFILER_SAMPLE_RATE", "0.1")),
+    slow_threshold=float(os.getenv("PROFILER_SLOW_MS", "1000")) / 1000,
+    max_slow=int(os.getenv("PROFILER_MAX_SLOW", "100")),
+)
+
+if os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes"):
+    profiler.enable()
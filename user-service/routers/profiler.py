@@ -0,0 +1,74 @@
+import functools
+import inspect
+import os
+import secrets
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+
+from profiler import profiler
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that profiles sync endpoints on the threadpool thread running them."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint, path)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _profiled(endpoint, path):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profiler.begin(path)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.end()
+    return wrapper
+
+
+def require_profiler_token(x_profiler_token: Annotated[str | None, Header()] = None):
+    """The debug endpoints do not exist unless PROFILER_CONTROL_TOKEN is set."""
+    expected = os.getenv("PROFILER_CONTROL_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_profiler_token or not secrets.compare_digest(x_profiler_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid profiler token")
+
+
+router = APIRouter(
+    prefix="/debug/profiler",
+    tags=["Profiler"],
+    dependencies=[Depends(require_profiler_token)],
+    include_in_schema=False,
+)
+
+
+@router.get("")
+def profiler_status():
+    return profiler.status()
+
+
+@router.post("/enable")
+def profiler_enable(sample_rate: float | None = None, slow_ms: float | None = None):
+    return profiler.enable(sample_rate, None if slow_ms is None else slow_ms / 1000)
+
+
+@router.post("/disable")
+def profiler_disable():
+    return profiler.disable()
+
+
+@router.get("/flamegraph", response_class=PlainTextResponse)
+def profiler_flamegraph():
+    folded = profiler.folded()
+    return "\n".join(folded) + "\n" if folded else ""
+
+
+@router.get("/slow")
+def profiler_slow(limit: int = 20):
+    return profiler.slow(limit)
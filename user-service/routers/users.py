@@ -8,17 +8,21 @@ import crud
 import schemas
 from auth import create_access_token, get_current_user, get_db
 from models import User
+from profiler import profiler
+from routers.profiler import ProfiledRoute
 from schemas import UserCreate, UserLogin, UserOut
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=ProfiledRoute)
 
 
 @router.post("/register")
 def register_user(payload: UserCreate, db: Annotated[Session, Depends(get_db)]):
-    db_user = crud.get_user_by_email(db, payload.email)
+    with profiler.stage("get_user_by_email"):
+        db_user = crud.get_user_by_email(db, payload.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    created = crud.create_user(db, payload)
+    with profiler.stage("create_user"):
+        created = crud.create_user(db, payload)
     return {
         "success": True,
         "data": {"user_id": created.id},
@@ -29,7 +33,8 @@ def register_user(payload: UserCreate, db: Annotated[Session, Depends(get_db)]):
 
 @router.post("/login")
 def login(form_data: UserLogin, db: Annotated[Session, Depends(get_db)]):
-    user = crud.authenticate_user(db, form_data.email, form_data.password)
+    with profiler.stage("authenticate"):
+        user = crud.authenticate_user(db, form_data.email, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     access_token_expires = timedelta(minutes=60)
@@ -54,7 +59,8 @@ def list_users(db: Annotated[Session, Depends(get_db)]):
 @router.get("/{user_id}", response_model=UserOut)
 def get_user_by_id(user_id: str, db: Annotated[Session, Depends(get_db)]):
     """Retrieve a single user by ID."""
-    user = crud.get_user(db, user_id)
+    with profiler.stage("get_user"):
+        user = crud.get_cached_user(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -67,11 +73,13 @@ def get_user_tokens(
     user_id: str,
     db: Annotated[Session, Depends(get_db)],
 ):
-    current_user = crud.get_user(db, user_id)
+    with profiler.stage("get_user"):
+        current_user = crud.get_cached_user(db, user_id)
     if not current_user:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    token = crud.get_user_push_tokens(db, user_id)
+    with profiler.stage("get_push_token"):
+        token = crud.get_cached_push_token(db, user_id)
     if not token:
         raise HTTPException(
             status_code=404, detail="No push tokens found for this user"
@@ -79,27 +87,43 @@ def get_user_tokens(
     return token
 
 
+@router.post("/push-tokens/prune")
+def prune_push_tokens(
+    payload: schemas.PushTokenPrune,
+    db: Annotated[Session, Depends(get_db)],
+):
+    """Bulk-delete push tokens that FCM reported as unregistered or invalid."""
+    with profiler.stage("prune"):
+        pruned = crud.prune_push_tokens(db, payload.tokens)
+    return {
+        "success": True,
+        "data": {"pruned": pruned},
+        "message": "pruned",
+        "meta": {"requested": len(payload.tokens)},
+    }
+
+
 @router.post("/{user_id}/push-token", response_model=schemas.PushTokenOut)
 def register_push_token(
     user_id: str,
     token_data: schemas.PushTokenData,
     db: Annotated[Session, Depends(get_db)],
 ):
-    current_user = crud.get_user(db, user_id)
+    with profiler.stage("get_user"):
+        current_user = crud.get_cached_user(db, user_id)
 
     if not current_user:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    existing = crud.get_user_push_tokens(db, user_id)
-    if existing:
-        # Update existing token
-        existing.token = token_data.token
-        db.commit()
-        db.refresh(existing)
-        return existing
+    with profiler.stage("get_push_token"):
+        existing = crud.get_user_push_tokens(db, user_id)
+    with profiler.stage("save_push_token"):
+        if existing:
+            # Update existing token
+            return crud.update_push_token(db, existing, token_data.token)
 
-    # Create new one
-    return crud.add_push_token(db, user_id, token_data)
+        # Create new one
+        return crud.add_push_token(db, user_id, token_data)
 
 
 @router.patch("/{user_id}", response_model=UserOut)
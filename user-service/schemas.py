@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 
 class UserPreferences(BaseModel):
@@ -35,6 +35,10 @@ class PushTokenData(BaseModel):
     token: str
 
 
+class PushTokenPrune(BaseModel):
+    tokens: list[str] = Field(max_length=1000)
+
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str